@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+One benchmark harness for every puzzle set and solver configuration.
+
+Usage:
+  python bench.py 9_sat 16_sat compact_sudokus/hard.txt --mode cdcl --heuristic vsids
+  python bench.py 16_sat --reps 5 --baseline bench_results/cdcl-vsids.csv
+
+Sets are folders or files under NCSudoku_benchmark_set (or any path): a folder means all
+its .txt puzzles, a file all the puzzles in it (one grid, or one compact puzzle per line).
+Every puzzle gets --warmup runs that are thrown away (encoder caches, imports) and then
+--reps timed runs, each in a WorkerPool worker. --timeout is the solver's own time limit
+(result UNKNOWN, counters kept); a run still busy worker_pool.KILL_GRACE seconds later is killed
+(TIMEOUT). A puzzle that is not solved in one run is not run again.
+
+Per puzzle the CSV has the median / p95 / min of the repetitions; the summary adds
+median and p95 over the puzzles and the PAR-2 score (mean time, unsolved = 2 x timeout).
+With --baseline the run is compared puzzle by puzzle against an earlier CSV of this script:
+a puzzle that got slower by more than --slowdown (and --min-diff seconds), or that the
+baseline solved and this run did not, is flagged and the exit code is 1.
+"""
+
+import argparse
+import csv
+import math
+import os
+import statistics
+import sys
+import time
+
+from cnf_cache import cached_grid_to_cnf
+from encoder import parse_file, grid_to_cnf, decode_model, check_solution, AMO_ENCODINGS
+from worker_pool import KILL_GRACE, WorkerPool
+import solver
+
+BENCH_SET = "NCSudoku_benchmark_set"
+#default output: RESULTS_DIR/<config label>.csv
+RESULTS_DIR = "bench_results"
+
+COLUMNS = ["set", "puzzle", "config", "result", "runs", "median_s", "p95_s", "min_s", "solve_median_s",
+           "backtracks", "conflicts", "decisions", "propagations"]
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("sets", nargs="+", help="folders/files under NCSudoku_benchmark_set, e.g. 9_sat or compact_sudokus/hard.txt")
+    p.add_argument("--limit", type=int, default=None, help="First N puzzles of every set")
+    p.add_argument("--warmup", type=int, default=1, help="Untimed runs per puzzle before the repetitions")
+    p.add_argument("--reps", type=int, default=3, help="Timed runs per puzzle")
+    p.add_argument("--timeout", type=float, default=120, help="Solver time limit per run; PAR-2 counts unsolved as twice this")
+    p.add_argument("--workers", type=int, default=1, help="Runs at the same time (more than 1 makes the timings noisier)")
+    p.add_argument("--out", default=None, help=f"CSV to write (default: {RESULTS_DIR}/<config>.csv)")
+    p.add_argument("--baseline", default=None, help="Earlier CSV of this script to compare against")
+    p.add_argument("--slowdown", type=float, default=0.2, help="Flag puzzles whose median grew by more than this fraction")
+    p.add_argument("--min-diff", type=float, default=0.05, help="...and by more than this many seconds (timer noise on fast puzzles)")
+    #solver configuration, as in main.py
+    p.add_argument("--mode", choices=["dpll", "cdcl", "portfolio", "split"], default=None)
+    p.add_argument("--heuristic", choices=["standard", "mom", "jw", "vsids"], default=None)
+    p.add_argument("--restarts", choices=["luby", "geometric", "lbd"], default=None)
+    p.add_argument("--amo-encoding", choices=AMO_ENCODINGS, default="pairwise")
+    p.add_argument("--standard-only", action='store_true', help="Disable Non-Consecutive constraint")
+    p.add_argument("--simplify-clues", action='store_true')
+    p.add_argument("--nogoods", action='store_true', help="DPLL with nogood recording")
+    p.add_argument("--no-cache", action='store_true', help="Encode every run instead of using the CNF cache")
+    p.add_argument("--label", default=None, help="Name of the configuration in the CSV (default: made from the options)")
+    return p.parse_args()
+
+def config_label(args) -> str:
+    parts = [args.mode or solver.MODE, args.heuristic or solver.HEURISTIC]
+    if args.restarts or solver.RESTARTS:
+        parts.append(args.restarts or solver.RESTARTS)
+    if args.amo_encoding != "pairwise":
+        parts.append(args.amo_encoding)
+    for flag in ("standard_only", "simplify_clues", "nogoods"):
+        if getattr(args, flag):
+            parts.append(flag.replace("_", "-"))
+    return "-".join(parts)
+
+def collect(sets, limit=None):
+    """[(set name, puzzle name, grid, N, B)] in file order"""
+    puzzles = []
+    for name in sets:
+        path = name if os.path.exists(name) else os.path.join(BENCH_SET, name)
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".txt")]
+        elif os.path.isfile(path):
+            files = [path]
+        else:
+            print(f"{name} not found", file=sys.stderr)
+            continue
+        found = []
+        for file in files:
+            grids = list(parse_file(file))
+            for i, (grid, N, B) in enumerate(grids, 1):
+                #one-grid files are named by the file, compact files by file:line
+                puzzle = os.path.basename(file) if len(grids) == 1 else f"{os.path.basename(file)}:{i}"
+                found.append((name, puzzle, grid, N, B))
+        puzzles.extend(found[:limit])
+    return puzzles
+
+def run_once(grid, N, B, config, timeout):
+    """runs inside a worker: encode + solve one grid -> (result, solve seconds, stats dict)"""
+    use_nc_rule = not config["standard_only"]
+    encode = grid_to_cnf if config["no_cache"] else cached_grid_to_cnf
+    clauses, num_vars = encode(grid, N, B, use_non_consecutive=use_nc_rule, amo_encoding=config["amo_encoding"],
+                               simplify_clues=config["simplify_clues"])
+    status, model, stats = solver.solve_cnf(clauses, num_vars, mode=config["mode"], heuristic=config["heuristic"],
+                                            restarts=config["restarts"], time_limit=timeout, nogoods=config["nogoods"])
+    if model is not None and check_solution(decode_model(model, N), N, B, use_non_consecutive=use_nc_rule, givens=grid):
+        status = "INVALID"
+    return status, stats.solve_time, stats.as_dict()
+
+def percentile(values, q):
+    """nearest-rank percentile, q in 0..100"""
+    values = sorted(values)
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+def run_bench(puzzles, args, config):
+    """
+    Runs every puzzle warmup + reps times and yields one CSV row (a dict) per puzzle,
+    in the order they finish. A puzzle's runs go one after another, the pool runs
+    different puzzles side by side.
+    """
+    todo = list(range(len(puzzles)))[::-1]
+    runs = {}       # puzzle index -> [(seconds, solve seconds, stats)] of the timed runs
+    started = {}    # puzzle index -> runs started so far
+    running = {}    # job id -> puzzle index
+    total = args.warmup + args.reps
+
+    with WorkerPool(run_once, workers=args.workers, timeout=args.timeout + KILL_GRACE) as pool:
+        while todo or running:
+            while todo and pool.idle() > 0:
+                i = todo.pop()
+                runs[i], started[i] = [], 1
+                running[pool.submit((*puzzles[i][2:], config, args.timeout))] = i
+            for job_id, status, value, seconds in pool.completed():
+                i = running.pop(job_id)
+                name, puzzle = puzzles[i][:2]
+                row = None
+                if status == "timeout":
+                    row = _row(name, puzzle, args.label, "TIMEOUT", runs[i])
+                elif status == "error":
+                    print(f"   {name} {puzzle}: worker error: {value}", file=sys.stderr)
+                    row = _row(name, puzzle, args.label, "ERROR", runs[i])
+                else:
+                    result, solve_time, stats = value
+                    if started[i] > args.warmup or result not in ("SAT", "UNSAT"):
+                        #an UNKNOWN run keeps its partial counters, even as a warmup
+                        runs[i].append((seconds, solve_time, stats))
+                    if result not in ("SAT", "UNSAT"):
+                        row = _row(name, puzzle, args.label, result, runs[i])
+                    elif started[i] == total:
+                        row = _row(name, puzzle, args.label, result, runs[i])
+                    else:
+                        started[i] += 1
+                        running[pool.submit((*puzzles[i][2:], config, args.timeout))] = i
+                if row is not None:
+                    del runs[i], started[i]
+                    yield row
+
+def _row(name, puzzle, label, result, runs):
+    row = dict.fromkeys(COLUMNS, "")
+    row.update({"set": name, "puzzle": puzzle, "config": label, "result": result, "runs": len(runs)})
+    if runs and result in ("SAT", "UNSAT"):
+        times = [t for t, _, _ in runs]
+        row.update({"median_s": f"{statistics.median(times):.4f}", "p95_s": f"{percentile(times, 95):.4f}",
+                    "min_s": f"{min(times):.4f}", "solve_median_s": f"{statistics.median(s for _, s, _ in runs):.4f}"})
+    if runs:
+        stats = runs[-1][2] #the counters are the same every run (UNKNOWN: how far it got)
+        for key in ("backtracks", "conflicts", "decisions", "propagations"):
+            row[key] = stats[key]
+    return row
+
+def solved(row) -> bool:
+    return row["result"] in ("SAT", "UNSAT") and row["median_s"] != ""
+
+def summarize(rows, timeout):
+    """(solved, puzzles, median s, p95 s, PAR-2 s) over the puzzles' medians"""
+    times = [float(r["median_s"]) for r in rows if solved(r)]
+    par2 = sum(float(r["median_s"]) if solved(r) else 2 * timeout for r in rows) / max(1, len(rows))
+    if not times:
+        return 0, len(rows), None, None, par2
+    return len(times), len(rows), statistics.median(times), percentile(times, 95), par2
+
+def print_summary(title, summary):
+    n_solved, n, med, p95, par2 = summary
+    line = f"{title}: solved {n_solved}/{n} | PAR-2: {par2:.4f}s"
+    if med is not None:
+        line += f" | median: {med:.4f}s | p95: {p95:.4f}s"
+    print(line)
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def compare(rows, baseline, args):
+    """prints the per-puzzle regressions against the baseline rows, returns how many there are"""
+    old = {(r["set"], r["puzzle"]): r for r in baseline}
+    flagged = 0
+    for r in rows:
+        b = old.get((r["set"], r["puzzle"]))
+        if b is None:
+            continue
+        if solved(b) and not solved(r):
+            print(f"   REGRESSION {r['set']} {r['puzzle']}: {b['result']} -> {r['result']}")
+            flagged += 1
+        elif solved(b) and solved(r):
+            before, after = float(b["median_s"]), float(r["median_s"])
+            if after > before * (1 + args.slowdown) and after - before > args.min_diff:
+                print(f"   SLOWER {r['set']} {r['puzzle']}: {before:.4f}s -> {after:.4f}s ({after / max(before, 1e-9):.2f}x)")
+                flagged += 1
+        elif not solved(b) and solved(r):
+            print(f"   now solved {r['set']} {r['puzzle']}: {b['result']} -> {r['result']} in {r['median_s']}s")
+    #the summary of the baseline over the same puzzles, so the PAR-2 scores are comparable
+    common = [old[(r["set"], r["puzzle"])] for r in rows if (r["set"], r["puzzle"]) in old]
+    print_summary(f"baseline ({len(common)} puzzles in common)", summarize(common, args.timeout))
+    print_summary("this run (same puzzles)", summarize([r for r in rows if (r["set"], r["puzzle"]) in old], args.timeout))
+    return flagged
+
+def main():
+    args = parse_args()
+    args.label = args.label or config_label(args)
+    config = {"mode": args.mode, "heuristic": args.heuristic, "restarts": args.restarts,
+              "amo_encoding": args.amo_encoding, "standard_only": args.standard_only,
+              "simplify_clues": args.simplify_clues, "nogoods": args.nogoods, "no_cache": args.no_cache}
+    out = args.out or os.path.join(RESULTS_DIR, args.label + ".csv")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    baseline = read_csv(args.baseline) if args.baseline else None
+
+    puzzles = collect(args.sets, args.limit)
+    print(f"{len(puzzles)} puzzles | config: {args.label} | warmup: {args.warmup} | reps: {args.reps}"
+          f" | timeout: {args.timeout}s | workers: {args.workers}")
+    print("-" * 50)
+
+    start = time.time()
+    rows = []
+    with open(out, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in run_bench(puzzles, args, config):
+            rows.append(row)
+            writer.writerow(row)
+            csv_file.flush()
+            timing = f"median {row['median_s']}s | p95 {row['p95_s']}s" if solved(row) else ""
+            print(f"   {row['set']} {row['puzzle']}: {row['result']} | {timing}")
+
+    print("-" * 50)
+    for name in args.sets:
+        print_summary(name, summarize([r for r in rows if r["set"] == name], args.timeout))
+    print_summary("all", summarize(rows, args.timeout))
+    print(f"results: {out} ({time.time() - start:.1f}s)")
+
+    if baseline is not None:
+        print(f"\ncompared with {args.baseline} (slower = median +{args.slowdown:.0%} and +{args.min_diff}s):")
+        flagged = compare(rows, baseline, args)
+        print(f"{flagged} puzzle(s) flagged")
+        if flagged:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
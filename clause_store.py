@@ -0,0 +1,70 @@
+"""
+Flat clause database shared by the encoder and the solver.
+
+Clause i occupies lits[start[i] : start[i] + size[i]] of one contiguous
+array('i'). Compared with a list of lists this costs 4 bytes per literal and
+8 per clause, instead of a list header per clause and a boxed int per literal,
+which is what made 25x25 instances cost hundreds of MB.
+"""
+
+from array import array
+from typing import Iterable, Iterator, Optional
+
+
+class ClauseStore:
+    __slots__ = ("lits", "start", "size")
+
+    def __init__(self, clauses: Optional[Iterable[Iterable[int]]] = None):
+        self.lits = array('i')
+        self.start = array('i')
+        self.size = array('i')
+        if clauses is not None:
+            self.extend(clauses)
+
+    def add(self, clause: Iterable[int]) -> int:
+        """append one clause, returns its index"""
+        lits = self.lits
+        begin = len(lits)
+        lits.extend(clause)
+        self.start.append(begin)
+        self.size.append(len(lits) - begin)
+        return len(self.start) - 1
+
+    #list-style name, so code written against List[List[int]] keeps working
+    append = add
+
+    def extend(self, clauses: Iterable[Iterable[int]]) -> None:
+        if isinstance(clauses, ClauseStore):
+            offset = len(self.lits)
+            self.lits.extend(clauses.lits)
+            self.start.extend(s + offset for s in clauses.start)
+            self.size.extend(clauses.size)
+            return
+        for clause in clauses:
+            self.add(clause)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, i: int) -> array:
+        s = self.start[i]
+        return self.lits[s:s + self.size[i]]
+
+    def __iter__(self) -> Iterator[array]:
+        lits = self.lits
+        size = self.size
+        for i, s in enumerate(self.start):
+            yield lits[s:s + size[i]]
+
+    def num_literals(self) -> int:
+        return len(self.lits)
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.lits, self.start, self.size))
+
+    def copy(self) -> "ClauseStore":
+        other = ClauseStore()
+        other.lits = array('i', self.lits)
+        other.start = array('i', self.start)
+        other.size = array('i', self.size)
+        return other
@@ -0,0 +1,80 @@
+"""
+On-disk cache of encodings, so repeated benchmark runs skip building them.
+
+    clauses, num_vars = cached_grid_to_cnf(grid, N, B, use_non_consecutive=False)
+
+Plain encodings only need encoder.base_formula, which is read from the cache (one
+file per size and rule set) and then reused for every puzzle in the process.
+simplify_clues encodings differ per puzzle and are cached whole, by a hash of the grid.
+Entries are binary CNF files (dimacs.write_binary) whose names also hash the encoding
+options and the source of encoder.py, so changing the encoder never serves an old
+encoding. Delete CACHE_DIR to clear it.
+"""
+
+import hashlib
+import inspect
+import os
+from typing import Tuple
+
+import encoder
+from clause_store import ClauseStore
+from dimacs import read_binary, write_binary
+
+CACHE_DIR = ".cnf_cache"
+
+_encoder_digest = None
+
+
+def _encoder_source_digest() -> bytes:
+    global _encoder_digest
+    if _encoder_digest is None:
+        with open(encoder.__file__, "rb") as f:
+            _encoder_digest = hashlib.sha1(f.read()).digest()
+    return _encoder_digest
+
+
+def grid_key(grid, N, B, **encode_opts) -> str:
+    """hex digest identifying the encoding of this grid with these options"""
+    #defaults filled in, so leaving out an option and passing its default give the same key
+    bound = inspect.signature(encoder.grid_to_cnf).bind(grid, N, B, **encode_opts)
+    bound.apply_defaults()
+    opts = {k: v for k, v in bound.arguments.items() if k not in ("grid", "N", "B")}
+    h = hashlib.sha1(_encoder_source_digest())
+    h.update(repr((N, B, sorted(opts.items()))).encode())
+    h.update(bytes(v for row in grid for v in row) if N < 256 else repr(grid).encode())
+    return h.hexdigest()
+
+
+def cached_base_formula(N, B, use_non_consecutive=True, amo_encoding="pairwise",
+                        cache_dir: str = CACHE_DIR) -> Tuple[ClauseStore, int]:
+    """encoder.base_formula, loaded from cache_dir (or built and saved there) the first time in a process"""
+    key = (N, B, use_non_consecutive, amo_encoding)
+    if key not in encoder._BASE_FORMULAS:
+        h = hashlib.sha1(_encoder_source_digest())
+        h.update(repr(key).encode())
+        path = os.path.join(cache_dir, f"base_{N}_{h.hexdigest()}.cnfb")
+        try:
+            encoder._BASE_FORMULAS[key] = read_binary(path)
+        except (OSError, ValueError):
+            clauses, num_vars = encoder.base_formula(*key)
+            os.makedirs(cache_dir, exist_ok=True)
+            write_binary(clauses, num_vars, path)
+    return encoder._BASE_FORMULAS[key]
+
+
+def cached_grid_to_cnf(grid, N, B, cache_dir: str = CACHE_DIR, **encode_opts) -> Tuple[ClauseStore, int]:
+    """grid_to_cnf(grid, N, B, **encode_opts), with whatever was encoded before read from cache_dir"""
+    if not encode_opts.get("simplify_clues"):
+        cached_base_formula(N, B, encode_opts.get("use_non_consecutive", True),
+                            encode_opts.get("amo_encoding", "pairwise"), cache_dir)
+        return encoder.grid_to_cnf(grid, N, B, **encode_opts)
+
+    path = os.path.join(cache_dir, grid_key(grid, N, B, **encode_opts) + ".cnfb")
+    try:
+        return read_binary(path)
+    except (OSError, ValueError):
+        pass
+    clauses, num_vars = encoder.grid_to_cnf(grid, N, B, **encode_opts)
+    os.makedirs(cache_dir, exist_ok=True)
+    write_binary(clauses, num_vars, path)
+    return clauses, num_vars
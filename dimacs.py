@@ -0,0 +1,242 @@
+"""
+CNF files: DIMACS text in and out, and a binary format that loads without parsing.
+
+    clauses, num_vars = read_dimacs("unsat_25.cnf.gz")
+    write_dimacs(clauses, num_vars, "out.cnf")
+    write_binary(clauses, num_vars, "out.cnfb")
+    clauses, num_vars = load_cnf("out.cnfb")     # either format
+
+The file is read in binary blocks of CHUNK_BYTES; each block is split and converted
+to an array('i') at once and its literals go into the store's literal array in one
+extend, so a multi-MB file never exists as a list of lists. gzip, xz and bzip2
+input is recognised by its magic bytes, the file name does not matter.
+
+The binary format is a header followed by the ClauseStore's own arrays:
+    b"CNFB" | int32 x4: byte-order mark, num_vars, clauses, literals | start | size | lits
+all int32 in native byte order. read_binary maps the file and copies each array out
+in one go.
+"""
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain
+from typing import BinaryIO, Iterable, List, Tuple
+
+from clause_store import ClauseStore
+
+_MAGIC = (
+    (b"\x1f\x8b", gzip.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+    (b"BZh", bz2.open),
+)
+
+#bytes parsed at a time; a block is split and converted to ints in one go
+CHUNK_BYTES = 1 << 22
+#clauses formatted per write in write_dimacs
+WRITE_BLOCK = 1 << 16
+
+_BINARY_MAGIC = b"CNFB"
+_BINARY_HEADER = struct.Struct("=4s4i")
+_BYTE_ORDER_MARK = 0x01020304
+
+
+def open_cnf(path: str) -> BinaryIO:
+    """binary file object for path ("-" = stdin), decompressing gzip/xz/bzip2 on the fly"""
+    if path == "-":
+        stdin = sys.stdin.buffer
+        head = stdin.peek(6)[:6]
+        for magic, opener in _MAGIC:
+            if head.startswith(magic):
+                return opener(stdin, "rb")
+        return stdin
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, opener in _MAGIC:
+        if head.startswith(magic):
+            return opener(path, "rb")
+    return open(path, "rb")
+
+
+def read_dimacs(path: str) -> Tuple[ClauseStore, int]:
+    """
+    (clauses, num_vars) from a DIMACS CNF file, plain or compressed.
+    Comment lines (c ...) are skipped, clauses may span lines, a trailing clause without
+    its 0 is kept and a '%' line (SATLIB files) ends the input.
+    num_vars is the larger of the header's count and the largest variable used.
+    Raises ValueError for a token that is not an integer.
+    """
+    store = ClauseStore()
+    lits, start, size = store.lits, store.start, store.size
+    declared = 0
+    begin = 0 #start of the clause being read
+    lineno = 0 #lines before the current block
+    rest = b""
+
+    with open_cnf(path) as f:
+        while True:
+            data = f.read(CHUNK_BYTES)
+            if data:
+                #whole lines only, the cut-off tail goes in front of the next block
+                block = rest + data
+                cut = block.rfind(b"\n") + 1
+                block, rest = block[:cut], block[cut:]
+            elif rest:
+                block, rest = rest, b""
+            else:
+                break
+
+            done = False
+            lines = None
+            if b"c" in block or b"p" in block or b"%" in block:
+                #comments or a header somewhere in here, go line by line
+                lines = block.split(b"\n")
+                body = []
+                for i, line in enumerate(lines):
+                    first = line.lstrip()[:1]
+                    if first == b"c":
+                        continue
+                    if first == b"p":
+                        parts = line.split()
+                        if len(parts) < 4 or parts[1] != b"cnf":
+                            raise ValueError(f"{path}:{lineno + i + 1}: bad header {_show(line)}")
+                        declared = int(parts[2])
+                    elif first == b"%":
+                        done = True
+                        break
+                    else:
+                        body.append(line)
+                block = b" ".join(body)
+            try:
+                vals = array('i', map(int, block.split()))
+            except ValueError:
+                raise ValueError(_bad_literal(path, lines or block.split(b"\n"), lineno)) from None
+            lineno += block.count(b"\n") if lines is None else len(lines) - 1
+
+            #the literals go in as one block, the zeros only mark where clauses end
+            end = len(lits)
+            lits.extend(filter(None, vals))
+            pos = 0
+            while True:
+                try:
+                    z = vals.index(0, pos)
+                except ValueError:
+                    break
+                end += z - pos
+                start.append(begin)
+                size.append(end - begin)
+                begin = end
+                pos = z + 1
+            if done:
+                break
+
+    if begin < len(lits):
+        start.append(begin)
+        size.append(len(lits) - begin)
+
+    num_vars = max(declared, max(lits, default=0), -min(lits, default=0))
+    return store, num_vars
+
+
+def _show(line: bytes) -> str:
+    return repr(line.strip().decode(errors="replace"))
+
+
+def _bad_literal(path: str, lines, lineno: int) -> str:
+    for i, line in enumerate(lines):
+        if line.lstrip()[:1] in (b"c", b"p", b"%"):
+            continue
+        for token in line.split():
+            try:
+                int(token)
+            except ValueError:
+                return f"{path}:{lineno + i + 1}: not a literal in {_show(line)}"
+    return f"{path}: not a literal"
+
+
+def write_dimacs(clauses: Iterable[Iterable[int]], num_vars: int, path) -> None:
+    """
+    DIMACS text, one clause per line. WRITE_BLOCK clauses at a time are formatted with a
+    single join over all their literals, instead of a string per clause.
+    """
+    if isinstance(clauses, ClauseStore):
+        #the store's clauses are back to back in lits
+        lits, sizes = clauses.lits, clauses.size
+    else:
+        clauses = clauses if isinstance(clauses, list) else list(clauses)
+        lits = list(chain.from_iterable(clauses))
+        sizes = list(map(len, clauses))
+
+    #the text of every literal, made once: literal-indexed like the solver (negative indices wrap)
+    top = max(max(lits, default=0), -min(lits, default=0))
+    words = [f"{v} " for v in range(top + 1)] + [f"{v} " for v in range(-top, 0)]
+    ends = [f"{v} 0\n" for v in range(top + 1)] + [f"{v} 0\n" for v in range(-top, 0)]
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"p cnf {num_vars} {len(sizes)}\n")
+        lo = 0
+        for first in range(0, len(sizes), WRITE_BLOCK):
+            block = sizes[first:first + WRITE_BLOCK]
+            hi = lo + sum(block)
+            f.write(_dimacs_lines(lits[lo:hi], block, words, ends))
+            lo = hi
+
+
+def _dimacs_lines(lits, sizes, words: List[str], ends: List[str]) -> str:
+    tokens = list(map(words.__getitem__, lits))
+    if 0 in sizes:
+        #an empty clause has no literal to hang its 0 on
+        out, pos = [], 0
+        for n in sizes:
+            out.append("".join(tokens[pos:pos + n]) + "0\n")
+            pos += n
+        return "".join(out)
+    for end in accumulate(sizes):
+        tokens[end - 1] = ends[lits[end - 1]]
+    return "".join(tokens)
+
+
+def write_binary(clauses: Iterable[Iterable[int]], num_vars: int, path) -> None:
+    """the binary format (see the module docstring); written to a temp file and renamed into place"""
+    if not isinstance(clauses, ClauseStore):
+        clauses = ClauseStore(clauses)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_BINARY_HEADER.pack(_BINARY_MAGIC, _BYTE_ORDER_MARK, num_vars, len(clauses), len(clauses.lits)))
+        for a in (clauses.start, clauses.size, clauses.lits):
+            a.tofile(f)
+    os.replace(tmp, path)
+
+
+def read_binary(path) -> Tuple[ClauseStore, int]:
+    """(clauses, num_vars) from a file written by write_binary; ValueError if it is not one"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _BINARY_HEADER.size:
+            raise ValueError(f"{path}: not a binary CNF file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            magic, mark, num_vars, num_clauses, num_lits = _BINARY_HEADER.unpack_from(m)
+            if magic != _BINARY_MAGIC or mark != _BYTE_ORDER_MARK:
+                raise ValueError(f"{path}: not a binary CNF file (or written on another byte order)")
+            store = ClauseStore()
+            pos = _BINARY_HEADER.size
+            for a, n in ((store.start, num_clauses), (store.size, num_clauses), (store.lits, num_lits)):
+                end = pos + n * a.itemsize
+                if end > len(m):
+                    raise ValueError(f"{path}: truncated")
+                a.frombytes(m[pos:end])
+                pos = end
+    return store, num_vars
+
+
+def load_cnf(path) -> Tuple[ClauseStore, int]:
+    """read_binary or read_dimacs, whichever the file's first bytes say it is"""
+    if path == "-":
+        return read_dimacs(path)
+    with open(path, "rb") as f:
+        binary = f.read(len(_BINARY_MAGIC)) == _BINARY_MAGIC
+    return read_binary(path) if binary else read_dimacs(path)
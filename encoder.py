@@ -16,68 +16,272 @@ You must encode:
   (4) For each value v and each sqrt(N)×sqrt(N) box: exactly one cell has v
   (5) Non-consecutive: orthogonal neighbors cannot differ by 1
   (6) Clues: unit clauses for the given puzzle
+
+The at-most-one half of every exactly-one group can be emitted with one of
+AMO_ENCODINGS; the compact ones add auxiliary variables numbered after N^3,
+so var(r,c,v) above is unchanged.
 """
 
 
-from typing import Tuple, Iterable, List
+from typing import Callable, Dict, Optional, Tuple, Iterable, List
 import math
+import sys
+
+from clause_store import ClauseStore
+from dimacs import open_cnf
+
+AMO_ENCODINGS = ("pairwise", "sequential", "commander", "product")
+
+#groups this small are always done pairwise (also the base case of the recursive encodings)
+AMO_PAIRWISE_MAX = 4
+
+#compact lines: '.' and '0' are empty cells, the digit bytes map to their values
+_COMPACT_DIGITS = bytes.maketrans(b".0123456789", bytes([0, *range(10)]))
+#warnings parse_file prints about malformed lines, later ones are only counted
+MAX_PARSE_WARNINGS = 5
 
 def parse_file(input_path: str):
     """
-    Generator that reads a file and yields Sudoku grids one by one.
-    Handles:
-    1. Compact/Dot format (one puzzle per line, e.g. "3.5...")
-    2. Standard format (one puzzle per file, space-separated)
+    Generator that reads a file and yields Sudoku grids one by one, as the lines come in.
+    input_path may be "-" (stdin) and gzip/xz/bzip2 compressed (see dimacs.open_cnf).
+    Every line is recognised on its own:
+    1. Compact/Dot format (one puzzle per line, e.g. "3.5...", N*N characters)
+    2. Standard format (N lines of N space-separated numbers, several grids may follow each other)
+    Blank lines are ignored. Lines that fit neither, and the rows of a grid that breaks off
+    (a row of another width follows, or the input ends), are skipped with a warning on
+    stderr and counted; the count is printed when the input is done.
     """
-    with open(input_path, "r") as f:
-        lines = [l.strip() for l in f if l.strip()]
-        
-    first_line = lines[0]
-    
-    #compact puzzles
-    if "." in first_line or (len(first_line) > 15 and " " not in first_line):
-        for line in lines:
-            #replacing the dots for zeroes
-            clean = line.replace(".", "0"
-                                 )
-            total_cells = len(clean)
-            n = int(math.isqrt(total_cells))
-            if n * n != total_cells:
+    skipped = 0
+    warnings = 0
+    rows: List[List[int]] = []
+    first_row = 0 #line number of rows[0]
+
+    def skip(lineno: int, why: str, count: int = 1) -> None:
+        nonlocal skipped, warnings
+        skipped += count
+        if warnings < MAX_PARSE_WARNINGS:
+            warnings += 1
+            print(f"{input_path}:{lineno}: skipped, {why}", file=sys.stderr)
+
+    with open_cnf(input_path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
                 continue
-                
-            b = int(math.isqrt(n))
-            nums = [int(c) for c in clean]
+            parts = line.split()
+
+            #compact puzzles
+            if len(parts) == 1:
+                puzzle = parse_compact(line)
+                if puzzle is None:
+                    skip(lineno, "not a compact puzzle")
+                else:
+                    yield puzzle
+                continue
+
+            #standard format
+            try:
+                row = [int(x) for x in parts]
+            except ValueError:
+                row = None
+            if row is None or not _is_box_size(len(row)) or min(row) < 0 or max(row) > len(row):
+                skip(lineno, "not a grid row")
+                continue
+            if rows and len(row) != len(rows[0]):
+                skip(first_row, f"grid ends after {len(rows)} of {len(rows[0])} rows", len(rows))
+                rows = []
+            if not rows:
+                first_row = lineno
+            rows.append(row)
+            if len(rows) == len(row):
+                n = len(row)
+                yield rows, n, math.isqrt(n)
+                rows = []
+
+    if rows:
+        skip(first_row, f"grid ends after {len(rows)} of {len(rows[0])} rows", len(rows))
+    if skipped:
+        print(f"{input_path}: {skipped} malformed line(s) skipped", file=sys.stderr)
+
+def parse_compact(line) -> Optional[Tuple[List[List[int]], int, int]]:
+    """(grid, N, B) from one compact puzzle ("3.5..."), str or bytes; None if it is not one"""
+    if isinstance(line, str):
+        line = line.encode("ascii", "replace")
+    line = line.strip()
+    n = math.isqrt(len(line))
+    if n * n != len(line) or line.translate(None, b".0123456789") != b"" or not _is_box_size(n):
+        return None
+    nums = list(line.translate(_COMPACT_DIGITS))
+    if max(nums) > n:
+        return None
+    return [nums[i*n : (i+1)*n] for i in range(n)], n, math.isqrt(n)
+
+def _is_box_size(n: int) -> bool:
+    """n = B*B for some B > 1"""
+    b = math.isqrt(n)
+    return b > 1 and b * b == n
 
-            yield [nums[i*n : (i+1)*n] for i in range(n)], n, b
+def at_most_one(lits: List[int], encoding: str, new_var: Callable[[], int]) -> List[List[int]]:
+    """
+    Clauses saying at most one of lits is true.
+
+      pairwise:   n(n-1)/2 binary clauses, no auxiliary variables
+      sequential: Sinz' sequential counter, 3n-4 clauses and n-1 auxiliaries
+      commander:  groups of 3 with a commander each, AMO over the commanders recursively
+      product:    Chen's 2-product, lits on a p x q grid with AMO over row and column auxiliaries
+    new_var() must return a fresh variable number on every call.
+    """
+    n = len(lits)
+    cls: List[List[int]] = []
+    if n <= 1:
+        return cls
+
+    if encoding == "pairwise" or n <= AMO_PAIRWISE_MAX:
+        for i in range(n):
+            for j in range(i + 1, n):
+                cls.append([-lits[i], -lits[j]])
+
+    elif encoding == "sequential":
+        #s[i] <=> "one of lits[0..i] is true"
+        s = [new_var() for _ in range(n - 1)]
+        cls.append([-lits[0], s[0]])
+        for i in range(1, n - 1):
+            cls.append([-lits[i], s[i]])
+            cls.append([-s[i - 1], s[i]])
+            cls.append([-lits[i], -s[i - 1]])
+        cls.append([-lits[n - 1], -s[n - 2]])
+
+    elif encoding == "commander":
+        commanders = []
+        for g in range(0, n, 3):
+            group = lits[g:g + 3]
+            c = new_var()
+            commanders.append(c)
+            cls.extend(at_most_one(group, "pairwise", new_var))
+            for x in group:
+                cls.append([-x, c])
+        cls.extend(at_most_one(commanders, "commander", new_var))
+
+    elif encoding == "product":
+        p = math.isqrt(n - 1) + 1
+        q = -(-n // p)
+        rows = [new_var() for _ in range(p)]
+        cols = [new_var() for _ in range(q)]
+        for k, x in enumerate(lits):
+            i, j = divmod(k, q)
+            cls.append([-x, rows[i]])
+            cls.append([-x, cols[j]])
+        cls.extend(at_most_one(rows, "product", new_var))
+        cls.extend(at_most_one(cols, "product", new_var))
 
-    #standard format
     else:
-        grid = []
-        for line in lines:
-            parts = line.split()
-            if len(parts) > 1:
-                grid.append([int(x) for x in parts])
-        
-        if grid:
-            n = len(grid)
-            b = int(math.isqrt(n))
-            yield grid, n, b
-
-def grid_to_cnf(grid, N, B, use_non_consecutive=True) -> Tuple[Iterable[Iterable[int]], int]:
+        raise ValueError(f"unknown AMO encoding: {encoding}")
+
+    return cls
+
+def clue_consequences(grid, N, B, use_non_consecutive=True) -> Optional[Dict[int, bool]]:
+    """
+    Variables the givens decide directly: the given value is true, and false are the
+    other values of that cell, the same value in its row/column/box and (non-consecutive)
+    the values one higher/lower in its orthogonal neighbours.
+    Returns None if two givens contradict each other.
+    """
+    fixed: Dict[int, bool] = {}
+
+    def var_id(r, c, v):
+        return r * (N * N) + c * N + v
+
+    def set_var(x, val):
+        if fixed.setdefault(x, val) != val:
+            return False
+        return True
+
+    for r in range(N):
+        for c in range(N):
+            v = grid[r][c]
+            if not v:
+                continue
+            if not set_var(var_id(r, c, v), True):
+                return None
+            br, bc = r - r % B, c - c % B
+            falses = [var_id(r, c, w) for w in range(1, N + 1) if w != v]
+            falses += [var_id(r, cc, v) for cc in range(N) if cc != c]
+            falses += [var_id(rr, c, v) for rr in range(N) if rr != r]
+            falses += [var_id(rr, cc, v) for rr in range(br, br + B) for cc in range(bc, bc + B) if (rr, cc) != (r, c)]
+            if use_non_consecutive:
+                for r2, c2 in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                    if 0 <= r2 < N and 0 <= c2 < N:
+                        if v > 1: falses.append(var_id(r2, c2, v - 1))
+                        if v < N: falses.append(var_id(r2, c2, v + 1))
+            for x in falses:
+                if not set_var(x, False):
+                    return None
+    return fixed
+
+#clue-independent formulas by (N, B, use_non_consecutive, amo_encoding), see base_formula
+_BASE_FORMULAS: Dict[Tuple[int, int, bool, str], Tuple[ClauseStore, int]] = {}
+
+def base_formula(N, B, use_non_consecutive=True, amo_encoding="pairwise") -> Tuple[ClauseStore, int]:
     """
-    Converts a single N x N grid into CNF clauses.
+    Everything grid_to_cnf emits except the clue units: the same for every puzzle of a size,
+    so it is built once per process and kept. Copy it before adding to it.
     """
+    key = (N, B, use_non_consecutive, amo_encoding)
+    if key not in _BASE_FORMULAS:
+        _BASE_FORMULAS[key] = _rule_clauses(N, B, use_non_consecutive, amo_encoding, {})
+    return _BASE_FORMULAS[key]
+
+def grid_to_cnf(grid, N, B, use_non_consecutive=True, amo_encoding="pairwise",
+                simplify_clues=False) -> Tuple[Iterable[Iterable[int]], int]:
+    """
+    Converts a single N x N grid into CNF clauses, returned as a flat ClauseStore.
+
+    amo_encoding: one of AMO_ENCODINGS, used for the at-most-one part of every exactly-one group
+    simplify_clues: apply the givens while encoding (see clue_consequences) instead of
+        appending them as units at the end: exactly-one groups a given already satisfies are
+        skipped, ruled-out literals are left out of the rest, and non-consecutive clauses
+        on a decided variable are dropped. Every decided variable still gets a unit clause,
+        so the model decodes the same way.
+    Without simplify_clues this is a copy of base_formula plus one unit per clue.
+    """
+    if simplify_clues:
+        fixed = clue_consequences(grid, N, B, use_non_consecutive)
+        if fixed is None:
+            return ClauseStore([[]]), N ** 3
+        clauses, num_vars = _rule_clauses(N, B, use_non_consecutive, amo_encoding, fixed)
+        for x in sorted(fixed):
+            clauses.append([x] if fixed[x] else [-x])
+        return clauses, num_vars
+
+    base, num_vars = base_formula(N, B, use_non_consecutive, amo_encoding)
+    clauses = base.copy()
+    for r in range(N):
+        row = grid[r]
+        for c in range(N):
+            if row[c] != 0:
+                clauses.append((r * (N * N) + c * N + row[c],))
+    return clauses, num_vars
+
+def _rule_clauses(N, B, use_non_consecutive, amo_encoding, fixed: Dict[int, bool]) -> Tuple[ClauseStore, int]:
+    """the Sudoku (and non-consecutive) rules, leaving out what the decided variables in fixed settle"""
     num_vars = N ** 3
-    clauses = []
+    clauses = ClauseStore()
 
     def var_id(r, c, v):
         return r * (N * N) + c * N + v
 
+    def new_var():
+        nonlocal num_vars
+        num_vars += 1
+        return num_vars
+
     def exactly_one(lits):
+        if fixed:
+            if any(fixed.get(x) for x in lits):
+                return
+            lits = [x for x in lits if x not in fixed]
         clauses.append(list(lits))
-        for i in range(len(lits)):
-            for j in range(i + 1, len(lits)):
-                clauses.append([-lits[i], -lits[j]])
+        clauses.extend(at_most_one(lits, amo_encoding, new_var))
 
     #1. standard 
     for r in range(N):
@@ -111,13 +315,60 @@ def grid_to_cnf(grid, N, B, use_non_consecutive=True) -> Tuple[Iterable[Iterable
                     if (r, c) > (r2, c2): continue
                     for v in range(1, N + 1):
                         x = var_id(r, c, v)
-                        if v > 1: clauses.append([-x, -var_id(r2, c2, v - 1)])
-                        if v < N: clauses.append([-x, -var_id(r2, c2, v + 1)])
+                        if x in fixed: continue
+                        if v > 1 and var_id(r2, c2, v - 1) not in fixed: clauses.append([-x, -var_id(r2, c2, v - 1)])
+                        if v < N and var_id(r2, c2, v + 1) not in fixed: clauses.append([-x, -var_id(r2, c2, v + 1)])
+
+    return clauses, num_vars
 
-    # 3. clues
+def decode_model(model, N) -> List[List[int]]:
+    """
+    Grid from a solver model (model[x] truthy = variable x true), through var(r,c,v) = r*N*N + c*N + v.
+    A cell gets 0 unless exactly one of its values is true.
+    """
+    grid = []
     for r in range(N):
+        row = []
         for c in range(N):
-            if grid[r][c] != 0:
-                clauses.append([var_id(r, c, grid[r][c])])
+            base = r * (N * N) + c * N
+            values = [v for v in range(1, N + 1) if model[base + v]]
+            row.append(values[0] if len(values) == 1 else 0)
+        grid.append(row)
+    return grid
 
-    return clauses, num_vars
\ No newline at end of file
+def check_solution(solution, N, B, use_non_consecutive=True, givens=None) -> List[str]:
+    """
+    Everything wrong with a solved grid: empty or out-of-range cells, repeated values in a
+    row/column/box, consecutive orthogonal neighbours and givens that were changed.
+    An empty list means the solution is valid.
+    """
+    errors = []
+    full = set(range(1, N + 1))
+
+    for r in range(N):
+        for c in range(N):
+            v = solution[r][c]
+            if v not in full:
+                errors.append(f"cell ({r},{c}) has no value")
+            elif givens is not None and givens[r][c] and givens[r][c] != v:
+                errors.append(f"cell ({r},{c}) is {v}, given {givens[r][c]}")
+
+    for r in range(N):
+        if set(solution[r]) != full:
+            errors.append(f"row {r} is not 1..{N}")
+    for c in range(N):
+        if {solution[r][c] for r in range(N)} != full:
+            errors.append(f"column {c} is not 1..{N}")
+    for br in range(0, N, B):
+        for bc in range(0, N, B):
+            box = {solution[r][c] for r in range(br, br + B) for c in range(bc, bc + B)}
+            if box != full:
+                errors.append(f"box ({br // B},{bc // B}) is not 1..{N}")
+
+    if use_non_consecutive:
+        for r in range(N):
+            for c in range(N):
+                for r2, c2 in ((r + 1, c), (r, c + 1)):
+                    if r2 < N and c2 < N and abs(solution[r][c] - solution[r2][c2]) == 1:
+                        errors.append(f"cells ({r},{c}) and ({r2},{c2}) are consecutive")
+    return errors
@@ -6,7 +6,10 @@ txt -> build an unsat by merging two sats, non=deterministcally look for one. It
 cnf -> build a puzzle with no clues, but modify the rules to include a deep, nontrivial contradiction (nb. this kind of puzzle is impossible to write down in sudoku (txt) format!). 
 This approach for UNSAt is fast and scalable - recommended for generating large unsat puzzles.
 
-The generator uses Glucose 4.2.1; a SOTA SAT solver. It requires you have Glucose binary installed/built, and requests a path to Glucose as an argument.
+The generator uses Glucose 4.2.1; a SOTA SAT solver. Pass the path to a Glucose binary with --glucose.
+Without --glucose it runs our own solver in-process instead (solver.IncrementalSolver): the empty-grid formula is
+loaded once per size and every candidate is one query with its clues as assumptions, so there is no temp file or
+process per query. Conflict counts of that backend are not comparable to Glucose's, adjust THRESHOLDS accordingly.
 The generator saves puzzles matching the treshold values of conflicts or time (per size x type). For your use, feel free to adjust(first lines after the imports).
 
 Note: -1 conflicts is Glucose timeout code - if you see it, especially when generating 25 SAT puzzles, consider increasing the timeout (one of this function flags/params).
@@ -14,7 +17,11 @@ Note: -1 conflicts is Glucose timeout code - if you see it, especially when gene
 
 import argparse, csv, datetime, math, os, random, re, subprocess, sys, tempfile, time
 from pathlib import Path
-from typing import Iterable, List, Tuple, Dict, Any, Optional
+from typing import Callable, Iterable, List, Tuple, Dict, Any, Optional
+
+from encoder import at_most_one, AMO_ENCODINGS
+import dimacs
+import solver as builtin_solver
 
 THRESHOLDS = {
     9: {
@@ -31,6 +38,9 @@ THRESHOLDS = {
     },
 }
 
+#at-most-one encoding used for the exactly-one groups (see encoder.AMO_ENCODINGS), set by --amo-encoding
+AMO_ENCODING = "pairwise"
+
 def logmsg(logf, msg: str) -> None:
     ts = datetime.datetime.now().strftime("%H:%M:%S")
     line = f"[{ts}] {msg}"
@@ -43,12 +53,11 @@ def logmsg(logf, msg: str) -> None:
 def var_id(r: int, c: int, v: int, n: int) -> int:
     return r * n * n + c * n + v
 
-def exactly_one(lits: Iterable[int]) -> List[List[int]]:
+#new_var hands out the auxiliary variables of the compact AMO encodings (see encoder.at_most_one)
+def exactly_one(lits: Iterable[int], amo_encoding: str, new_var: Callable[[], int]) -> List[List[int]]:
     lits = list(lits)
     cls = [lits]
-    for i in range(len(lits)):
-        for j in range(i + 1, len(lits)):
-            cls.append([-lits[i], -lits[j]])
+    cls.extend(at_most_one(lits, amo_encoding, new_var))
     return cls
 
 def orthogonal_neighbors(r: int, c: int, n: int):
@@ -58,30 +67,37 @@ def orthogonal_neighbors(r: int, c: int, n: int):
     if c + 1 < n: yield r, c + 1
 
 #encoder
-def encode_nonconsecutive_to_cnf(grid: List[List[int]]) -> Tuple[List[List[int]], int]:
+def encode_nonconsecutive_to_cnf(grid: List[List[int]], amo_encoding: Optional[str] = None) -> Tuple[List[List[int]], int]:
     n = len(grid)
     b = int(math.isqrt(n))
     num_vars = n ** 3 
     cls: List[List[int]] = []
+    amo = amo_encoding or AMO_ENCODING
+
+    #auxiliary variables of the compact AMO encodings go after the n^3 cell variables
+    def new_var() -> int:
+        nonlocal num_vars
+        num_vars += 1
+        return num_vars
 
     #cell constraints
     for r in range(n):
         for c in range(n):
-            cls.extend(exactly_one(var_id(r, c, v, n) for v in range(1, n + 1)))
+            cls.extend(exactly_one((var_id(r, c, v, n) for v in range(1, n + 1)), amo, new_var))
 
     #row / column / block constraints
     for v in range(1, n + 1):
         #rows
         for r in range(n):
-            cls.extend(exactly_one(var_id(r, cc, v, n) for cc in range(n)))
+            cls.extend(exactly_one((var_id(r, cc, v, n) for cc in range(n)), amo, new_var))
         #cols
         for c in range(n):
-            cls.extend(exactly_one(var_id(rr, c, v, n) for rr in range(n)))
+            cls.extend(exactly_one((var_id(rr, c, v, n) for rr in range(n)), amo, new_var))
         #blocks
         for br in range(0, n, b):
             for bc in range(0, n, b):
                 cells = [(br+i, bc+j) for i in range(b) for j in range(b)]
-                cls.extend(exactly_one(var_id(rr, cc, v, n) for rr, cc in cells))
+                cls.extend(exactly_one((var_id(rr, cc, v, n) for rr, cc in cells), amo, new_var))
 
     #non-consecutive rule
     for r in range(n):
@@ -104,10 +120,8 @@ def encode_nonconsecutive_to_cnf(grid: List[List[int]]) -> Tuple[List[List[int]]
 
 
 def write_dimacs(cls: List[List[int]], num_vars: int, path: Path) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(f"p cnf {num_vars} {len(cls)}\n")
-        for cl in cls:
-            f.write(" ".join(str(x) for x in cl) + " 0\n")
+    #bulk formatting, see dimacs.write_dimacs
+    dimacs.write_dimacs(cls, num_vars, path)
 
 def write_grid(grid: List[List[int]], path: Path):
     with open(path, "w", encoding="utf-8") as f:
@@ -214,6 +228,51 @@ def encode_to_tempfile(grid):
     write_dimacs(cls,nv,tmp)
     return tmp,nv,len(cls)
 
+class InProcessSolver:
+    """
+    Stand-in for the Glucose path: one IncrementalSolver per size on the clue-free formula,
+    clues go in as assumptions and learnt clauses are kept from query to query.
+    """
+    def __init__(self):
+        self.solvers={}
+
+    def query(self, grid, timeout, fresh=False):
+        """same dict as run_solver; fresh=True measures on a new solver (no learnt clauses from earlier queries)"""
+        n=len(grid)
+        if fresh or n not in self.solvers:
+            cls,nv=encode_nonconsecutive_to_cnf([[0]*n for _ in range(n)])
+            inc=builtin_solver.IncrementalSolver(cls,nv)
+            if fresh:
+                return self._run(inc,grid,timeout)
+            self.solvers[n]=inc
+        return self._run(self.solvers[n],grid,timeout)
+
+    def query_cnf(self, cls, nv, timeout):
+        """a whole formula (cnf mode), on its own solver"""
+        t0=time.time()
+        inc=builtin_solver.IncrementalSolver(cls,nv)
+        ok=inc.solve(time_limit=timeout)
+        result="TIMEOUT" if ok is None else ("SAT" if ok else "UNSAT")
+        return {"result":result,"conflicts":inc.stats.conflicts,"time":time.time()-t0}
+
+    @staticmethod
+    def _run(inc, grid, timeout):
+        n=len(grid)
+        clues=[var_id(r,c,grid[r][c],n) for r in range(n) for c in range(n) if grid[r][c]]
+        t0=time.time()
+        ok=inc.solve(clues,time_limit=timeout)
+        result="TIMEOUT" if ok is None else ("SAT" if ok else "UNSAT")
+        return {"result":result,"conflicts":inc.stats.conflicts,"time":time.time()-t0}
+
+def solve_grid(solver, grid, timeout, fresh=False):
+    """SAT/UNSAT of a grid: in-process for an InProcessSolver, else through a temp file and Glucose"""
+    if isinstance(solver, InProcessSolver):
+        return solver.query(grid, timeout, fresh)
+    tmp,_,_=encode_to_tempfile(grid)
+    res=run_solver(solver,tmp,timeout)
+    tmp.unlink(missing_ok=True)
+    return res
+
 def build_merged_from_two(p1,p2):
     n=len(p1)
     out=[[0]*n for _ in range(n)]
@@ -243,9 +302,7 @@ def random_prune_until_unsat(n, base, solver, timeout, min_conf, min_time, ratio
             merged=build_merged_from_two(p1,p2)
 
             for _ in range(MAX_PRUNE):
-                tmp,_,_=encode_to_tempfile(merged)
-                res=run_solver(solver,tmp,timeout)
-                tmp.unlink(missing_ok=True)
+                res=solve_grid(solver,merged,timeout)
 
                 if res["result"]=="UNSAT":
                     hard=(res["conflicts"]>=min_conf) or (res["time"]>=min_time)
@@ -341,16 +398,21 @@ def manifest_close(w):
 
 def main():
     ap=argparse.ArgumentParser()
-    ap.add_argument("--glucose",required=True)
+    ap.add_argument("--glucose",default=None,help="Glucose binary (default: our solver, in-process)")
     ap.add_argument("--out",default="benchmark_puzzles")
     ap.add_argument("--num",type=int,default=5)
     ap.add_argument("--quick-timeout",type=int,default=30)
     ap.add_argument("--mode",choices=["txt","cnf"],default="txt")
+    ap.add_argument("--amo-encoding",choices=AMO_ENCODINGS,default="pairwise")
     ap.add_argument("--ratios",type=str,
         default="0.45, 0.5, 0.4, 0.3, 0.35, 0.2, 0.65, 0.25, 0.15, 0.6")
     args=ap.parse_args()
 
+    global AMO_ENCODING
+    AMO_ENCODING=args.amo_encoding
+
     ratios=[float(x) for x in args.ratios.split(",") if x.strip()]
+    solver=args.glucose or InProcessSolver()
     sizes=[9,16,25]
 
     root=Path(args.out)
@@ -381,9 +443,7 @@ def main():
 
                 for ratio in ratios:
                     cand=make_sat_puzzle(base,ratio)
-                    tmp,_,_=encode_to_tempfile(cand)
-                    res=run_solver(args.glucose,tmp,args.quick_timeout)
-                    tmp.unlink(missing_ok=True)
+                    res=solve_grid(solver,cand,args.quick_timeout)
 
                     hard=(res["conflicts"]>=SAT_CONF) or (res["time"]>=SAT_TIME)
                     logmsg(log,f"[{n} sat-test r={ratio:.2f}] conf={res['conflicts']} t={res['time']:.2f}")
@@ -398,9 +458,7 @@ def main():
                     sel_ratio=ratio
                     logmsg(log,f"[{n}] SAT fallback r={ratio:.2f}")
 
-                tmp,_,_=encode_to_tempfile(selected)
-                resf=run_solver(args.glucose,tmp,args.quick_timeout)
-                tmp.unlink(missing_ok=True)
+                resf=solve_grid(solver,selected,args.quick_timeout,fresh=True)
 
                 hard=(resf["conflicts"]>=SAT_CONF) or (resf["time"]>=SAT_TIME)
 
@@ -435,18 +493,14 @@ def main():
                 while created<args.num:
                     try:
                         puz=random_prune_until_unsat(
-                            n,base,args.glucose,args.quick_timeout,
+                            n,base,solver,args.quick_timeout,
                             UNSAT_CONF,UNSAT_TIME,ratios,log
                         )
                     except RuntimeError:
                         logmsg(log,f"[{n} unsat] FAILED")
                         break
 
-                    cls3,nv3=encode_nonconsecutive_to_cnf(puz)
-                    tmp=Path(tempfile.mktemp(suffix=".cnf"))
-                    write_dimacs(cls3,nv3,tmp)
-                    resu=run_solver(args.glucose,tmp,args.quick_timeout)
-                    tmp.unlink(missing_ok=True)
+                    resu=solve_grid(solver,puz,args.quick_timeout,fresh=True)
 
                     hard=(resu["conflicts"]>=UNSAT_CONF) or (resu["time"]>=UNSAT_TIME)
 
@@ -478,7 +532,10 @@ def main():
                     f=unsat_dir/f"unsat_{created:03}.cnf"
                     write_dimacs(cls_uns, nv_uns, f)
 
-                    resu = run_solver(args.glucose, f, args.quick_timeout)
+                    if isinstance(solver, InProcessSolver):
+                        resu = solver.query_cnf(cls_uns, nv_uns, args.quick_timeout)
+                    else:
+                        resu = run_solver(solver, f, args.quick_timeout)
 
                     row = {
                         "size":n,"type":"unsat","index":created,
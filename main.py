@@ -5,7 +5,8 @@ SAT Assignment Part 2 - Non-consecutive Sudoku Solver (puzzle -> SAT/UNSAT)
 Do NOT modify this file - instead, implement your function in encoder.py
 
 Usage:
-  python main.py --in <puzzle.txt>
+  python main.py --in <puzzle.txt>             (also .gz/.xz/.bz2, or - for stdin)
+  python main.py --sat --in <formula.cnf>      (also .cnf.gz / .cnf.xz)
 
 Behavior:
   - Reads a Sudoku puzzle in plain text format (N x N grid, 0 = empty).
@@ -17,43 +18,168 @@ Behavior:
 """
 
 import argparse
+import json
 import sys
 import time
-from encoder import parse_file, grid_to_cnf  
+from cnf_cache import cached_grid_to_cnf
+from dimacs import load_cnf
+from encoder import parse_file, grid_to_cnf, decode_model, check_solution, AMO_ENCODINGS
+from presolve import propagate_grid, elimination_clauses
+from preprocess import preprocess, extend_model
+from worker_pool import WorkerPool
 import solver 
 
 def parse_args():
     p = argparse.ArgumentParser()
     p.add_argument("--in", dest="inp", required=True)
-    p.add_argument("--sat", dest="sat", action='store_true', help="Parse as DIMACS CNF format")
+    p.add_argument("--sat", dest="sat", action='store_true', help="Parse as DIMACS CNF format (plain, gzip or xz) or a binary CNF file")
     p.add_argument("--standard-only", action='store_true', help="Disable Non-Consecutive constraint")
-    return p.parse_args()
+    p.add_argument("--mode", choices=["dpll", "cdcl", "portfolio", "split"], default=None, help="Search mode (default: solver.MODE)")
+    p.add_argument("--amo-encoding", choices=AMO_ENCODINGS, default="pairwise", help="At-most-one encoding for the exactly-one groups")
+    p.add_argument("--simplify-clues", action='store_true', help="Apply the givens while encoding instead of as trailing unit clauses")
+    p.add_argument("--presolve", action='store_true', help="Fill in what Sudoku reasoning already decides before encoding (naked and hidden singles, non-consecutive exclusions, locked candidates; see presolve.py)")
+    p.add_argument("--preprocess", action='store_true', help="Simplify the CNF (subsumption, strengthening, probing, variable elimination) before solving")
+    p.add_argument("--heuristic", choices=["standard", "mom", "jw", "vsids"], default=None, help="Branching heuristic (default: solver.HEURISTIC)")
+    p.add_argument("--restarts", choices=["luby", "geometric", "lbd"], default=None, help="Restart policy, with phase saving (default: solver.RESTARTS; lbd needs --mode cdcl)")
+    p.add_argument("--nogoods", action='store_true', default=None, help="DPLL records the decisions behind every conflict as a clause (default: solver.NOGOODS)")
+    p.add_argument("--cache", action='store_true', help="Reuse encodings from the on-disk CNF cache (cnf_cache.CACHE_DIR)")
+    p.add_argument("--print-solution", action='store_true', help="Print the solved grid and check it against the rules")
+    p.add_argument("--check", action='store_true', help="Check every solution against the rules, Result: INVALID if it breaks one")
+    p.add_argument("--time-limit", type=float, default=None, help="Seconds per solve, Result: UNKNOWN when they run out")
+    p.add_argument("--conflict-limit", type=int, default=None, help="Conflicts per solve, Result: UNKNOWN when they run out")
+    p.add_argument("--decision-limit", type=int, default=None, help="Decisions per solve, Result: UNKNOWN when they run out")
+    p.add_argument("--jobs", type=int, default=1, help="Solve the puzzles of a multi-puzzle file on N worker processes")
+    p.add_argument("--json", action='store_true', help="One JSON object per result (status, time and the solver's stats) instead of the text line")
+    p.add_argument("--profile", metavar="FILE", default=None, help="Run the solver under cProfile, per-function timings of all puzzles go to FILE (raw profile if it ends in .prof), not with --jobs")
+    args = p.parse_args()
+    if args.profile and args.jobs > 1:
+        #the workers would all write the same FILE
+        p.error("--profile only profiles one process, it cannot be combined with --jobs > 1")
+    return args
+
+def solve_puzzle(grid, N, B, args):
+    """
+    encode (optionally presolve) and solve one grid
+    -> (status, seconds, solver stats, solved grid, rule violations)
+    the grid and the violations are only filled in for SAT with --print-solution/--check
+    """
+    if args.profile:
+        solver.PROFILE = args.profile
+    use_nc_rule = not args.standard_only
+    givens = grid
+    encode_opts = dict(use_non_consecutive=use_nc_rule, amo_encoding=args.amo_encoding,
+                       simplify_clues=args.simplify_clues)
+    encode = cached_grid_to_cnf if args.cache else grid_to_cnf
+
+    #encoding
+    if args.presolve:
+        reduced = propagate_grid(grid, N, B, use_non_consecutive=use_nc_rule)
+        if reduced is None:
+            #contradiction in the givens: an empty clause lets the solver report UNSAT
+            clauses, num_vars = [[]], N ** 3
+        else:
+            grid, candidates = reduced
+            clauses, num_vars = encode(grid, N, B, **encode_opts)
+            clauses.extend(elimination_clauses(candidates, N))
+    else:
+        clauses, num_vars = encode(grid, N, B, **encode_opts)
+
+    reconstruction = None
+    if args.preprocess:
+        clauses, reconstruction = preprocess(clauses, num_vars)
+
+    #start solving
+    start_t = time.time()
+    status, model, stats = solver.solve_cnf(clauses, num_vars, mode=args.mode, heuristic=args.heuristic, restarts=args.restarts,
+                                            time_limit=args.time_limit, conflict_limit=args.conflict_limit,
+                                            decision_limit=args.decision_limit, nogoods=args.nogoods)
+    duration = time.time() - start_t
+
+    solution = errors = None
+    if model is not None and (args.print_solution or args.check):
+        if reconstruction is not None:
+            extend_model(model, reconstruction)
+        solution = decode_model(model, N)
+        errors = check_solution(solution, N, B, use_non_consecutive=use_nc_rule, givens=givens)
+        if errors and args.check:
+            status = "INVALID"
+    return status, duration, stats, solution, errors
+
+def solve_dimacs(args):
+    """solve a DIMACS file: one result line, the model as a v-line with --print-solution"""
+    if args.profile:
+        solver.PROFILE = args.profile
+    start_t = time.time()
+    original, num_vars = load_cnf(args.inp)
+    parse_time = time.time() - start_t
+
+    clauses, reconstruction = original, None
+    if args.preprocess:
+        clauses, reconstruction = preprocess(original, num_vars)
+
+    start_t = time.time()
+    status, model, stats = solver.solve_cnf(clauses, num_vars, mode=args.mode, heuristic=args.heuristic, restarts=args.restarts,
+                                            time_limit=args.time_limit, conflict_limit=args.conflict_limit,
+                                            decision_limit=args.decision_limit, nogoods=args.nogoods)
+    duration = time.time() - start_t
+
+    if model is not None and reconstruction is not None:
+        extend_model(model, reconstruction)
+    if model is not None and args.check:
+        if not all(any((lit > 0) == bool(model[abs(lit)]) for lit in clause) for clause in original):
+            status = "INVALID"
+
+    if args.json:
+        print(json.dumps({"file": args.inp, "vars": num_vars, "clauses": len(original), "parse_time": parse_time,
+                          "time": duration, "result": status, **stats.as_dict()}))
+    else:
+        line = (f"[CNF]: {args.inp} | Vars: {num_vars} | Clauses: {len(original)} | Parse: {parse_time:.4f}s"
+                f" | Time: {duration:.4f}s | Result: {status} | Backtracks: {stats.backtracks}"
+                f" | Conflicts: {stats.conflicts} | Restarts: {stats.restarts}")
+        if stats.winner is not None:
+            line += f" | Winner: {stats.winner}"
+        print(line)
+    if args.print_solution and model is not None:
+        print("v " + " ".join(str(v if model[v] else -v) for v in range(1, num_vars + 1)) + " 0")
 
 def main():
     args = parse_args()
     if args.sat:
-
-        print("DIMACS mode not fully integrated with bulk parser yet.")
+        solve_dimacs(args)
         return
     
     puzzles_generator = parse_file(args.inp)
 
-    use_nc_rule = not args.standard_only
+    if args.jobs > 1:
+        #puzzles are independent: spread them over worker processes, results still come back in file order
+        with WorkerPool(solve_puzzle, workers=args.jobs) as pool:
+            jobs = ((grid, N, B, args) for grid, N, B in puzzles_generator)
+            report(_unwrap(pool.imap(jobs)), args.print_solution, args.json)
+    else:
+        report((solve_puzzle(grid, N, B, args) for grid, N, B in puzzles_generator), args.print_solution, args.json)
+
+def _unwrap(pool_results):
+    for state, value, seconds in pool_results:
+        if state == "ok":
+            yield value
+        else:
+            print(f"worker error: {value}", file=sys.stderr)
+            yield "ERROR", seconds, solver.SolverStats(), None, None
 
-    count = 0
-    for grid, N, B in puzzles_generator:
-        count += 1
-        
-        #encoding
-        clauses, num_vars = grid_to_cnf(grid, N, B, use_non_consecutive=use_nc_rule)
-        
-        #start solving
-        start_t = time.time()
-        status, _ = solver.solve_cnf(clauses, num_vars)
-        end_t = time.time()
-        duration = end_t - start_t
-        
-        print(f"[PUZZLE]: {count} | Time: {duration:.4f}s | Result: {status} | Backtracks: {solver.BACKTRACK_COUNT}")
+def report(results, print_solution=False, as_json=False):
+    for count, (status, duration, stats, solution, errors) in enumerate(results, 1):
+        if as_json:
+            print(json.dumps({"puzzle": count, "time": duration, "result": status, **stats.as_dict()}))
+        else:
+            line = f"[PUZZLE]: {count} | Time: {duration:.4f}s | Result: {status} | Backtracks: {stats.backtracks} | Conflicts: {stats.conflicts} | Restarts: {stats.restarts}"
+            if stats.winner is not None:
+                line += f" | Winner: {stats.winner}"
+            print(line)
+        if print_solution and solution is not None:
+            width = len(str(len(solution)))
+            for row in solution:
+                print(" ".join(str(v).rjust(width) for v in row))
+            print("[CHECK]: ok" if not errors else "[CHECK]: " + "; ".join(errors))
         sys.stdout.flush()
 
 if __name__ == "__main__":
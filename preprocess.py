@@ -0,0 +1,289 @@
+"""
+CNF preprocessing between encoding and solve_cnf.
+
+Passes (run in the order given, see PASSES):
+  subsume:    drop clauses that contain another clause (the encoder emits the same
+              binary twice where a row/column and a box overlap)
+  strengthen: self-subsuming resolution, C = (l or A) and D = (-l or A or B) -> D loses -l
+  probe:      failed literals: if x propagates to a conflict, -x is a unit; literals
+              implied by both x and -x are units as well
+  eliminate:  bounded variable elimination, replaces the clauses of a variable by all
+              their resolvents when that does not increase the number of clauses
+Units (clues and whatever a pass derives) are applied as they show up, which removes
+the satisfied exactly-one groups and shortens the rest.
+
+Variable numbers are kept, so num_vars and var(r,c,v) stay the same. Fixed and eliminated
+variables just no longer occur; extend_model() gives them their values back afterwards.
+"""
+
+import time
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from clause_store import ClauseStore
+from solver import _Engine
+
+PASSES = ("subsume", "strengthen", "probe", "eliminate")
+
+#probing: at most this many variables (most occurrences first) per probe pass
+PROBE_LIMIT = 2000
+#elimination: skip variables with more occurrences than this in either polarity
+BVE_MAX_OCC = 10
+#elimination: skip a variable whose resolvents would be longer than this
+BVE_MAX_RESOLVENT = 16
+
+#(witness literal, clause): going backwards, the witness is made true if the clause is not satisfied
+Reconstruction = List[Tuple[int, List[int]]]
+
+
+class _Formula:
+    """clauses (sorted literal lists, None = deleted) with literal occurrence sets and pending units"""
+
+    def __init__(self, num_vars: int):
+        self.num_vars = num_vars
+        self.clauses: List[Optional[List[int]]] = []
+        self.occ: List[Set[int]] = [set() for _ in range(2 * num_vars + 1)]
+        self.value = [0] * (2 * num_vars + 1)      # literal-indexed like the solver, 1 = true
+        self.eliminated: Set[int] = set()
+        self.stack: Reconstruction = []
+        self.units: List[int] = []
+        self.unsat = False
+
+    def live(self) -> int:
+        return sum(1 for c in self.clauses if c is not None)
+
+    def removed_vars(self) -> int:
+        return sum(1 for v in range(1, self.num_vars + 1) if self.value[v]) + len(self.eliminated)
+
+    def add(self, lits: Iterable[int]) -> None:
+        value = self.value
+        clause = set()
+        for lit in lits:
+            if value[lit] == 1 or -lit in clause:
+                return  # satisfied or tautology
+            if value[lit] == 0:
+                clause.add(lit)
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.units.append(clause.pop())
+        else:
+            ci = len(self.clauses)
+            self.clauses.append(sorted(clause))
+            for lit in clause:
+                self.occ[lit].add(ci)
+
+    def remove(self, ci: int) -> None:
+        for lit in self.clauses[ci]:
+            self.occ[lit].discard(ci)
+        self.clauses[ci] = None
+
+    def strip(self, ci: int, lit: int) -> None:
+        """remove lit from clause ci"""
+        clause = self.clauses[ci]
+        clause.remove(lit)
+        self.occ[lit].discard(ci)
+        if len(clause) == 1:
+            self.units.append(clause[0])
+            self.remove(ci)
+
+    def flush_units(self) -> None:
+        """assign the pending units and simplify everything they touch"""
+        value = self.value
+        while self.units and not self.unsat:
+            lit = self.units.pop()
+            if value[lit] == 1:
+                continue
+            if value[lit] == -1:
+                self.unsat = True
+                return
+            value[lit] = 1
+            value[-lit] = -1
+            self.stack.append((lit, [lit]))
+            for ci in list(self.occ[lit]):
+                self.remove(ci)
+            for ci in list(self.occ[-lit]):
+                self.strip(ci, -lit)
+
+    def store(self) -> ClauseStore:
+        if self.unsat:
+            return ClauseStore([[]])
+        return ClauseStore(c for c in self.clauses if c is not None)
+
+
+def _subsume(f: _Formula) -> None:
+    occ = f.occ
+    order = sorted((ci for ci, c in enumerate(f.clauses) if c is not None), key=lambda ci: len(f.clauses[ci]))
+    for ci in order:
+        clause = f.clauses[ci]
+        if clause is None:
+            continue
+        cset = set(clause)
+        #every clause containing this one also contains its rarest literal
+        rarest = min(clause, key=lambda q: len(occ[q]))
+        for di in list(occ[rarest]):
+            other = f.clauses[di]
+            if di != ci and len(other) >= len(clause) and cset.issubset(other):
+                f.remove(di)
+
+
+def _strengthen(f: _Formula) -> None:
+    occ = f.occ
+    changed = True
+    while changed and not f.unsat:
+        changed = False
+        for ci in range(len(f.clauses)):
+            clause = f.clauses[ci]
+            if clause is None:
+                continue
+            for lit in clause:
+                rest = set(clause)
+                rest.discard(lit)
+                for di in list(occ[-lit]):
+                    other = f.clauses[di]
+                    if other is not None and len(other) >= len(clause) and rest.issubset(other):
+                        f.strip(di, -lit)
+                        changed = True
+                if f.clauses[ci] is None:
+                    break
+        f.flush_units()
+
+
+def _probe(f: _Formula) -> None:
+    #the solver's watched-literal propagation does the work
+    engine = _Engine(f.num_vars)
+    engine.load(c for c in f.clauses if c is not None)
+    if not engine.ok or engine.propagate() is not None:
+        f.unsat = True
+        return
+    value = engine.value
+    candidates = [v for v in range(1, f.num_vars + 1) if f.occ[v] and f.occ[-v]]
+    candidates.sort(key=lambda v: -(len(f.occ[v]) + len(f.occ[-v])))
+
+    for v in candidates[:PROBE_LIMIT]:
+        if value[v] != 0:
+            continue
+        implied: List[Set[int]] = []
+        for lit in (v, -v):
+            engine.decide(lit)
+            confl = engine.propagate()
+            implied.append(set(engine.trail[engine.trail_lim[0] + 1:]))
+            engine.backtrack(0)
+            if confl is not None:
+                #failed literal
+                engine.add_clause([-lit])
+                if not engine.ok or engine.propagate() is not None:
+                    f.unsat = True
+                    return
+                break
+        else:
+            for lit in implied[0] & implied[1]:
+                if value[lit] == 0:
+                    engine.add_clause([lit])
+            if not engine.ok or engine.propagate() is not None:
+                f.unsat = True
+                return
+
+    f.units.extend(engine.trail)
+    f.flush_units()
+
+
+def _eliminate(f: _Formula) -> None:
+    occ = f.occ
+    candidates = [v for v in range(1, f.num_vars + 1)
+                  if f.value[v] == 0 and v not in f.eliminated and (occ[v] or occ[-v])]
+    candidates.sort(key=lambda v: len(occ[v]) * len(occ[-v]))
+
+    for v in candidates:
+        if f.unsat:
+            return
+        if f.value[v] != 0 or not (occ[v] or occ[-v]):
+            continue
+        pos = list(occ[v])
+        neg = list(occ[-v])
+        if len(pos) > BVE_MAX_OCC or len(neg) > BVE_MAX_OCC:
+            continue
+        resolvents = []
+        ok = True
+        for pi in pos:
+            for ni in neg:
+                merged = set(f.clauses[pi])
+                merged.discard(v)
+                tautology = False
+                for lit in f.clauses[ni]:
+                    if lit == -v:
+                        continue
+                    if -lit in merged:
+                        tautology = True
+                        break
+                    merged.add(lit)
+                if tautology:
+                    continue
+                if len(merged) > BVE_MAX_RESOLVENT or len(resolvents) >= len(pos) + len(neg):
+                    ok = False
+                    break
+                resolvents.append(merged)
+            if not ok:
+                break
+        if not ok:
+            continue
+
+        #v defaults to false, and becomes true if one of its positive clauses needs it
+        for pi in pos:
+            f.stack.append((v, list(f.clauses[pi])))
+        f.stack.append((-v, []))
+        for ci in pos + neg:
+            f.remove(ci)
+        f.eliminated.add(v)
+        for r in resolvents:
+            f.add(r)
+        f.flush_units()
+
+
+_PASS_FUNCS = {
+    "subsume": _subsume,
+    "strengthen": _strengthen,
+    "probe": _probe,
+    "eliminate": _eliminate,
+}
+
+
+def preprocess(clauses: Iterable[Iterable[int]], num_vars: int, passes: Sequence[str] = PASSES,
+               verbose: bool = True) -> Tuple[ClauseStore, Reconstruction]:
+    """
+    Simplified clauses (same variable numbering) and the reconstruction stack for extend_model.
+    With verbose every pass prints its time and how many clauses and variables it removed.
+    An UNSAT formula comes back as a single empty clause.
+    """
+    f = _Formula(num_vars)
+    for clause in clauses:
+        f.add(clause)
+    f.flush_units()
+
+    for name in passes:
+        if f.unsat:
+            break
+        clauses_before = f.live()
+        vars_before = f.removed_vars()
+        start = time.perf_counter()
+        _PASS_FUNCS[name](f)
+        f.flush_units()
+        if verbose:
+            print(f"[PRE] {name}: {time.perf_counter() - start:.4f}s | clauses -{clauses_before - f.live()}"
+                  f" | vars -{f.removed_vars() - vars_before}{' | UNSAT' if f.unsat else ''}")
+    return f.store(), f.stack
+
+
+def extend_model(model, stack: Reconstruction) -> None:
+    """
+    Fills in the fixed/eliminated variables of a model of the preprocessed formula, in place.
+    model is indexed by variable, truthy = true (e.g. a list or bytearray of 0/1).
+    """
+    def satisfied(clause: List[int]) -> bool:
+        for lit in clause:
+            if bool(model[abs(lit)]) == (lit > 0):
+                return True
+        return False
+
+    for witness, clause in reversed(stack):
+        if not satisfied(clause):
+            model[abs(witness)] = 1 if witness > 0 else 0
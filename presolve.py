@@ -0,0 +1,177 @@
+"""
+Sudoku-level propagation before the puzzle is handed to the SAT solver.
+
+Works directly on candidate bitmasks (bit v-1 set = value v still possible)
+per cell and applies, until nothing changes:
+  (1) naked singles: a cell with one candidate removes it from its row, column and box
+  (2) hidden singles: a value with one possible cell in a row, column or box goes there
+  (3) non-consecutive exclusions: if every candidate of a cell is w-1 or w+1,
+      no orthogonal neighbour can be w (for a solved cell v that rules out v-1 and v+1)
+  (4) locked candidates: if a value's places in a box all lie on one row/column,
+      it is removed from the rest of that row/column, and vice versa
+
+Unit propagation over the CNF already gets (1) and (2) through the exactly-one
+clauses, but the pair case of (3) and all of (4) are out of its reach, so those are
+what actually raise the number of fixed variables before the search starts.
+"""
+
+from typing import List, Optional, Tuple
+
+
+def _units(N: int, B: int) -> List[List[int]]:
+    """flat cell indices (r*N + c) of every row, column and box"""
+    units = []
+    for r in range(N):
+        units.append([r * N + c for c in range(N)])
+    for c in range(N):
+        units.append([r * N + c for r in range(N)])
+    for br in range(0, N, B):
+        for bc in range(0, N, B):
+            units.append([(br + dr) * N + bc + dc for dr in range(B) for dc in range(B)])
+    return units
+
+
+def _neighbors(i: int, N: int) -> List[int]:
+    r, c = divmod(i, N)
+    out = []
+    if r > 0: out.append(i - N)
+    if r + 1 < N: out.append(i + N)
+    if c > 0: out.append(i - 1)
+    if c + 1 < N: out.append(i + 1)
+    return out
+
+
+def propagate_grid(grid, N, B, use_non_consecutive=True) -> Optional[Tuple[List[List[int]], List[int]]]:
+    """
+    Returns (reduced_grid, candidates) where reduced_grid has every forced cell
+    filled in and candidates[r*N + c] is the remaining bitmask of that cell.
+    Returns None if the givens already contradict each other.
+    """
+    full = (1 << N) - 1
+    cells = N * N
+    units = _units(N, B)
+    lines = units[:2 * N]
+    boxes = units[2 * N:]
+    #(line, box) pairs that overlap, with the overlapping cells
+    intersections = []
+    for line in lines:
+        for box in boxes:
+            common = set(line) & set(box)
+            if common:
+                intersections.append((line, box, common))
+    peers = [set() for _ in range(cells)]
+    for unit in units:
+        for i in unit:
+            peers[i].update(unit)
+    for i in range(cells):
+        peers[i].discard(i)
+    peers = [list(p) for p in peers]
+    neighbors = [_neighbors(i, N) for i in range(cells)]
+
+    cand = [full] * cells
+    for r in range(N):
+        for c in range(N):
+            v = grid[r][c]
+            if v:
+                cand[r * N + c] = 1 << (v - 1)
+
+    placed = [False] * cells
+    changed = True
+    while changed:
+        changed = False
+
+        for i in range(cells):
+            m = cand[i]
+            if m == 0:
+                return None
+
+            #naked single
+            if not placed[i] and m & (m - 1) == 0:
+                placed[i] = True
+                changed = True
+                for p in peers[i]:
+                    if cand[p] & m:
+                        cand[p] &= ~m
+                        if cand[p] == 0:
+                            return None
+
+            #non-consecutive: values w with m ⊆ {w-1, w+1} are impossible next door
+            if use_non_consecutive:
+                low = (m & -m).bit_length()        # smallest candidate value
+                high = m.bit_length()              # largest candidate value
+                banned = 0
+                if low == high:
+                    if low > 1: banned |= 1 << (low - 2)
+                    if low < N: banned |= 1 << low
+                elif high == low + 2 and m == (1 << (low - 1)) | (1 << (high - 1)):
+                    banned = 1 << low
+                if banned:
+                    for nb in neighbors[i]:
+                        if cand[nb] & banned:
+                            cand[nb] &= ~banned
+                            changed = True
+                            if cand[nb] == 0:
+                                return None
+
+        #hidden singles
+        for unit in units:
+            for v in range(N):
+                bit = 1 << v
+                where = -1
+                for i in unit:
+                    if cand[i] & bit:
+                        if where >= 0:
+                            where = -2
+                            break
+                        where = i
+                if where == -1:
+                    return None
+                if where >= 0 and cand[where] != bit:
+                    cand[where] = bit
+                    changed = True
+
+        #locked candidates (pointing / claiming)
+        for line, box, common in intersections:
+            inside = 0
+            for i in common:
+                inside |= cand[i]
+            line_rest = 0
+            for i in line:
+                if i not in common:
+                    line_rest |= cand[i]
+            box_rest = 0
+            for i in box:
+                if i not in common:
+                    box_rest |= cand[i]
+            #values confined to the intersection in one unit are cleared from the other
+            for unit, confined in ((line, inside & ~box_rest), (box, inside & ~line_rest)):
+                if not confined:
+                    continue
+                for i in unit:
+                    if i not in common and cand[i] & confined:
+                        cand[i] &= ~confined
+                        changed = True
+                        if cand[i] == 0:
+                            return None
+
+    reduced = [[0] * N for _ in range(N)]
+    for i in range(cells):
+        m = cand[i]
+        if m & (m - 1) == 0:
+            r, c = divmod(i, N)
+            reduced[r][c] = m.bit_length()
+    return reduced, cand
+
+
+def elimination_clauses(candidates: List[int], N: int) -> List[List[int]]:
+    """negative unit clauses for every value ruled out in a cell that is still open"""
+    clauses = []
+    for i, m in enumerate(candidates):
+        if m & (m - 1) == 0:
+            continue  # solved cells are covered by the reduced grid's clues
+        r, c = divmod(i, N)
+        base = r * N * N + c * N
+        for v in range(1, N + 1):
+            if not m & (1 << (v - 1)):
+                clauses.append([-(base + v)])
+    return clauses
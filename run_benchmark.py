@@ -2,6 +2,7 @@ import os
 import time
 import subprocess
 import csv
+import json
 
 
 dir = "NCSudoku_benchmark_set" 
@@ -16,6 +17,8 @@ puzzle_dirs = [
 output = "benchmark_results.csv"
 
 timout_secs = 120
+#extra main.py options for every run, e.g. ["--nogoods"] or ["--mode", "cdcl", "--heuristic", "vsids"]
+main_args = []
 
 def run_tests():
     print(f"starting tests | timeout = {timout_secs} seconds")
@@ -23,7 +26,8 @@ def run_tests():
 
     with open(output, mode='w', newline='') as csv_file:
         writer = csv.writer(csv_file)
-        writer.writerow(["folder", "puzzle", "time (s)", "result", "backtracks"])
+        writer.writerow(["folder", "puzzle", "time (s)", "result", "backtracks", "conflicts", "decisions", "propagations",
+                         "propagate (s)", "choose var (s)", "simplify (s)"])
 
         #loop through each folder
         for folder in puzzle_dirs:
@@ -44,33 +48,31 @@ def run_tests():
                 start_time = time.time()
                 try:
                     result = subprocess.run(
-                        ["python", "main.py", "--in", full_path],
+                        ["python", "main.py", "--in", full_path, "--check", "--cache", "--json"] + main_args,
                         capture_output=True,
                         text=True,
                         timeout=timout_secs
                     )
                     duration = time.time() - start_time
-                    output_text = result.stdout.strip()
-                    status = "UNKNOWN"
-                    backtracks = "0"
-                    
-                    if "Result:" in output_text:
-                        # SAT/UNSAT
-                        status = "SAT" if "SAT" in output_text else "UNSAT"
-                    
-                    if "Backtracks:" in output_text:
-                        # backtracks number:
-                        parts = output_text.split("Backtracks:")
-                        if len(parts) > 1:
-                            backtracks = parts[1].strip()
+                    # main.py --json: one object per puzzle, the solver's own line comes before it
+                    stats = {"result": "UNKNOWN"}
+                    for line in result.stdout.splitlines():
+                        if line.startswith("{"):
+                            stats = json.loads(line)
+                    # SAT/UNSAT, INVALID if the solution failed the check
+                    status = stats["result"]
+                    backtracks = stats.get("backtracks", 0)
 
                     print(f"{duration:.2f}s | {status} | BT: {backtracks}")
                     
-                    writer.writerow([folder, filename, f"{duration:.4f}", status, backtracks])
+                    writer.writerow([folder, filename, f"{duration:.4f}", status, backtracks,
+                                     stats.get("conflicts", 0), stats.get("decisions", 0), stats.get("propagations", 0),
+                                     f"{stats.get('propagate_time', 0):.4f}", f"{stats.get('choose_time', 0):.4f}",
+                                     f"{stats.get('simplify_time', 0):.4f}"])
 
                 except subprocess.TimeoutExpired:
                     print("TIMEOUT")
-                    writer.writerow([folder, filename, "TIMEOUT", "TIMEOUT", "TIMEOUT"])
+                    writer.writerow([folder, filename, "TIMEOUT", "TIMEOUT", "TIMEOUT"] + [""] * 6)
                 except Exception as e:
                     print(f"error: {e}")
 
@@ -1,8 +1,10 @@
 import os
-import subprocess
 import csv
-import sys
-import time
+
+from cnf_cache import cached_grid_to_cnf
+from encoder import grid_to_cnf, parse_compact, decode_model, check_solution
+from worker_pool import KILL_GRACE, WorkerPool
+import solver
 
 
 BASE_DIR = os.path.join("NCSudoku_benchmark_set", "compact_sudokus")
@@ -14,8 +16,19 @@ FILES = [
 ]
 
 OUTPUT_CSV = "results_compact.csv"
-TEMP_FILE = "temp_current_puzzle.txt"
 TIMEOUT = 120 
+#the solver stops itself after TIMEOUT seconds (result UNKNOWN, stats kept); a worker is only
+#killed if it is still busy KILL_GRACE seconds later (e.g. stuck encoding)
+#puzzles solved at the same time (each worker is one long-lived process, see worker_pool.py)
+WORKERS = 1
+#solver settings, None = the defaults in solver.py
+MODE = None
+HEURISTIC = None
+#True: dpll records nogoods (the results_compact_* CSVs were made without)
+NOGOODS = None
+USE_NC_RULE = False
+#reuse encodings from earlier runs (see cnf_cache.py), writes them to cnf_cache.CACHE_DIR
+USE_CACHE = False
 
 def count_givens(puzzle_string):
     """Counts non-empty cells (digits 1-9) in the string"""
@@ -25,12 +38,27 @@ def count_givens(puzzle_string):
             count += 1
     return count
 
+def solve_line(puzzle_line):
+    """runs inside a worker: one compact puzzle line -> (result, backtracks, initial props), INVALID if the model breaks a rule"""
+    parsed = parse_compact(puzzle_line)
+    if parsed is None:
+        raise ValueError(f"not a compact puzzle ({len(puzzle_line)} characters): {puzzle_line[:40]!r}")
+    grid, n, b = parsed
+    encode = cached_grid_to_cnf if USE_CACHE else grid_to_cnf
+    clauses, num_vars = encode(grid, n, b, use_non_consecutive=USE_NC_RULE)
+    status, model, stats = solver.solve_cnf(clauses, num_vars, mode=MODE, heuristic=HEURISTIC, time_limit=TIMEOUT,
+                                            nogoods=NOGOODS)
+    if model is not None and check_solution(decode_model(model, n), n, b, USE_NC_RULE, givens=grid):
+        status = "INVALID"
+    return status, stats.backtracks, stats.initial_props
+
 def run_tests():
     print(f"starting the benchmarking")
-    print(f"output: {OUTPUT_CSV}")
+    print(f"output: {OUTPUT_CSV} | workers: {WORKERS} | timeout: {TIMEOUT}s")
     print("-" * 50)
 
-    with open(OUTPUT_CSV, mode='w', newline='') as csv_file:
+    with open(OUTPUT_CSV, mode='w', newline='') as csv_file, \
+            WorkerPool(solve_line, workers=WORKERS, timeout=TIMEOUT + KILL_GRACE) as pool:
         writer = csv.writer(csv_file)
         writer.writerow(["Source_File", "Puzzle_ID", "Givens", "InitProps", "Time", "Result", "Backtracks"])
 
@@ -50,81 +78,35 @@ def run_tests():
                 print(f"error from file: {e}")
                 continue
 
-            print(f"   Found {len(lines)} puzzles.")
-
-            for i, puzzle_line in enumerate(lines):
-                puzzle_id = i + 1
-                num_givens = count_givens(puzzle_line)
-
-                #writing for the single puzzle
-                with open(TEMP_FILE, "w") as tf:
-                    tf.write(puzzle_line)
-
-                start_time = time.time()
-                process = subprocess.Popen(
-                    ["python", "main.py", "--in", TEMP_FILE, "--standard-only"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-
-                final_output = ""
-                timed_out = False
-                
-                try:
-                    while process.poll() is None:
-                        elapsed = int(time.time() - start_time)
-                        if elapsed > TIMEOUT:
-                            process.kill()
-                            timed_out = True
-                            raise subprocess.TimeoutExpired(process.args, TIMEOUT)
-                        
-                        print(f"\r #{puzzle_id} (Givens: {num_givens}): {elapsed}/{TIMEOUT}s", end="", flush=True)
-                        time.sleep(0.1)
-
-                    stdout, _ = process.communicate()
-                    final_output = stdout.strip()
-                    duration = time.time() - start_time
-
-                except subprocess.TimeoutExpired:
-                    duration = TIMEOUT
-                    print(f"\r #{puzzle_id} (Givens: {num_givens}): TIMEOUT", end="", flush=True)
-                
-                #parsing logic 
-                p_res = "UNKNOWN"
-                p_bt = "0"
-                p_props = "0"
-                
-                if timed_out:
-                    p_res = "TIMEOUT"
-                    p_bt = "TIMEOUT"
-                    p_props = "TIMEOUT"
-                elif "[PUZZLE]" in final_output:
-                    try:
-                        parts = final_output.split("|")
-                        for part in parts:
-                            if "Result:" in part: 
-                                p_res = part.split(":")[1].strip()
-                            if "Backtracks:" in part: 
-                                p_bt = part.split(":")[1].strip()
-                            if "InitProps:" in part: 
-                                raw_prop = part.split(":")[1].strip()
-                                p_props = raw_prop.split()[0] 
-                    except: pass
-
+            puzzles = []
+            for i, line in enumerate(lines):
+                if parse_compact(line) is None:
+                    print(f"   #{i + 1}: not a compact puzzle (N*N cells of '.' or digits, N = B*B), skipped: {line[:40]!r}")
+                else:
+                    puzzles.append((i + 1, line))
+            print(f"   Found {len(puzzles)} puzzles.")
 
+            results = pool.imap((line,) for _, line in puzzles)
+            for (puzzle_id, line), (status, value, duration) in zip(puzzles, results):
+                num_givens = count_givens(line)
 
+                if status == "ok":
+                    p_res, p_bt, p_props = value
+                elif status == "timeout":
+                    p_res = p_bt = p_props = "TIMEOUT"
+                else:
+                    print(f"\r #{puzzle_id}: worker error: {value}")
+                    p_res, p_bt, p_props = "UNKNOWN", "0", "0"
 
                 #save
                 writer.writerow([filename, puzzle_id, num_givens, p_props, f"{duration:.4f}", p_res, p_bt])
                 csv_file.flush()
-                
-                if not timed_out:
+
+                if status != "timeout":
                     print(f"\r #{puzzle_id} (Givens: {num_givens} | Props: {p_props}): {duration:.2f}s | {p_res} | BT: {p_bt}   ")
                 else:
-                    print("") 
+                    print(f"\r #{puzzle_id} (Givens: {num_givens}): TIMEOUT")
 
-    if os.path.exists(TEMP_FILE): os.remove(TEMP_FILE)
     print("-" * 50)
     print(f"looks fine bruv, nice!")
 
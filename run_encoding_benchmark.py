@@ -0,0 +1,90 @@
+import os
+import time
+import subprocess
+import csv
+import json
+
+import encoder
+from encoder import parse_file, grid_to_cnf, AMO_ENCODINGS
+
+#compares the at-most-one encodings of grid_to_cnf: clause count, encode time and solve time
+
+dir = "NCSudoku_benchmark_set"
+puzzle_dirs = [
+                "test_sat",
+            #    "9_sat",
+            #    "9_unsat",
+            #    "16_sat",
+            #    "25_sat"
+                   ]
+output = "benchmark_results_encodings.csv"
+
+timout_secs = 120
+#extra solver flags passed to main.py for every run (--check: a wrong solution shows up as INVALID)
+solver_args = ["--mode", "cdcl", "--heuristic", "vsids", "--check", "--json"]
+
+def encode_stats(path, encoding):
+    """(clauses, variables, encode seconds) for the first puzzle in the file"""
+    grid, N, B = next(parse_file(path))
+    #grid_to_cnf caches the rule clauses per (size, rules, encoding), empty it so every row times a full encode
+    encoder._BASE_FORMULAS.clear()
+    start_time = time.time()
+    clauses, num_vars = grid_to_cnf(grid, N, B, amo_encoding=encoding)
+    return len(clauses), num_vars, time.time() - start_time
+
+def solve_time(path, encoding):
+    """(status, solver seconds as reported by main.py) or TIMEOUT"""
+    try:
+        result = subprocess.run(
+            ["python", "main.py", "--in", path, "--amo-encoding", encoding] + solver_args,
+            capture_output=True,
+            text=True,
+            timeout=timout_secs
+        )
+    except subprocess.TimeoutExpired:
+        return "TIMEOUT", "TIMEOUT"
+
+    status, duration = "UNKNOWN", ""
+    for line in result.stdout.splitlines():
+        if line.startswith("{"):
+            stats = json.loads(line)
+            status, duration = stats["result"], f"{stats['time']:.4f}"
+    return status, duration
+
+def run_tests():
+    print(f"starting encoding comparison | timeout = {timout_secs} seconds")
+    print("-" * 50)
+
+    with open(output, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["folder", "puzzle", "encoding", "clauses", "variables", "encode (s)", "solve (s)", "result"])
+
+        for folder in puzzle_dirs:
+            folder_path = os.path.join(dir, folder)
+
+            if not os.path.exists(folder_path):
+                print(f"{folder} (folder not found)")
+                continue
+
+            print(f"\n processing: {folder}")
+
+            files = [f for f in os.listdir(folder_path) if f.endswith(".txt")]
+            files.sort()
+            for filename in files[:10]:
+                full_path = os.path.join(folder_path, filename)
+
+                for encoding in AMO_ENCODINGS:
+                    print(f"   {filename} [{encoding}]...", end=" ", flush=True)
+                    num_clauses, num_vars, enc_time = encode_stats(full_path, encoding)
+                    status, duration = solve_time(full_path, encoding)
+                    print(f"{num_clauses} clauses | enc {enc_time:.3f}s | solve {duration}s | {status}")
+
+                    writer.writerow([folder, filename, encoding, num_clauses, num_vars,
+                                     f"{enc_time:.4f}", duration, status])
+                    csv_file.flush()
+
+    print("-" * 50)
+    print("benchmarking finished.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import subprocess
+import csv
+
+#peak RSS and encode / solve time per puzzle (encode into a ClauseStore + cdcl/vsids)
+#(every puzzle runs in its own process so the peak memory of one run does not leak into the next)
+#to compare clause representations, run it on both versions of the code and diff the CSVs
+
+dir = "NCSudoku_benchmark_set"
+puzzle_dirs = [
+                "16_sat",
+                "25_sat",
+                   ]
+output = "benchmark_results_memory.csv"
+
+timout_secs = 120
+
+def run_child(path):
+    """encode + solve one puzzle, print one result line"""
+    import contextlib, io
+    import solver
+    from encoder import parse_file, grid_to_cnf, decode_model, check_solution
+
+    grid, N, B = next(parse_file(path))
+    start_time = time.time()
+    clauses, num_vars = grid_to_cnf(grid, N, B)
+    enc_time = time.time() - start_time
+
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, model, _ = solver.solve_cnf(clauses, num_vars, mode="cdcl", heuristic="vsids")
+    if model is not None and check_solution(decode_model(model, N), N, B, givens=grid):
+        status = "INVALID"
+    print(f"{status} {enc_time:.4f} {time.time() - start_time:.4f}")
+
+def measure(path):
+    """(status, encode s, solve s, peak RSS in MB) - the RSS comes from wait4, so it is there even on timeout"""
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--child", path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True
+    )
+    deadline = time.time() + timout_secs
+    while True:
+        pid, _, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        if time.time() > deadline:
+            proc.kill()
+            _, _, usage = os.wait4(proc.pid, 0)
+            proc.returncode = -9
+            return "TIMEOUT", "", "TIMEOUT", usage.ru_maxrss // 1024
+        time.sleep(0.05)
+
+    proc.returncode = 0
+    parts = proc.stdout.read().split()
+    if len(parts) != 3:
+        return "ERROR", "", "", usage.ru_maxrss // 1024
+    return parts[0], parts[1], parts[2], usage.ru_maxrss // 1024
+
+def run_tests():
+    print(f"starting memory benchmark | timeout = {timout_secs} seconds")
+    print("-" * 50)
+
+    with open(output, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["folder", "puzzle", "result", "encode (s)", "solve (s)", "peak RSS (MB)"])
+
+        for folder in puzzle_dirs:
+            folder_path = os.path.join(dir, folder)
+
+            if not os.path.exists(folder_path):
+                print(f"{folder} (folder not found)")
+                continue
+
+            print(f"\n processing: {folder}")
+
+            files = [f for f in os.listdir(folder_path) if f.endswith(".txt")]
+            files.sort()
+            for filename in files[:10]:
+                full_path = os.path.join(folder_path, filename)
+
+                print(f"   {filename}...", end=" ", flush=True)
+                status, enc_time, solve_time, rss = measure(full_path)
+                print(f"{status} | solve {solve_time}s | {rss} MB")
+                writer.writerow([folder, filename, status, enc_time, solve_time, rss])
+                csv_file.flush()
+
+    print("-" * 50)
+    print("benchmarking finished.")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        run_child(sys.argv[2])
+    else:
+        run_tests()
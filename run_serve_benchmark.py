@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+from encoder import parse_file
+
+#load generator for serve.py: CONCURRENCY clients, each sending one request and waiting
+#for its answer before the next (closed loop), over the server's Unix socket.
+#prints throughput, latency percentiles and how the requests ended.
+
+SOCKET = "/tmp/sudoku_serve.sock"
+PUZZLES = os.path.join("NCSudoku_benchmark_set", "compact_sudokus", "all_9x9.txt")
+REQUESTS = 500
+CONCURRENCY = 4
+TIMEOUT = 10
+#serve.py settings when the benchmark starts its own server (no server on SOCKET yet)
+SERVER_ARGS = ["--workers", str(os.cpu_count() or 1), "--warm", "9"]
+#also time this many puzzles through one `python main.py` call each, for comparison
+MAIN_PY_RUNS = 5
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--socket", default=SOCKET)
+    p.add_argument("--puzzles", default=PUZZLES, help="Any file parse_file reads")
+    p.add_argument("--requests", type=int, default=REQUESTS)
+    p.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    p.add_argument("--timeout", type=float, default=TIMEOUT, help="Per-request budget sent to the server")
+    p.add_argument("--main-py-runs", type=int, default=MAIN_PY_RUNS)
+    return p.parse_args()
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[max(0, -(-len(values) * q // 100) - 1)]
+
+def start_server(path):
+    """serve.py on path, once it accepts connections"""
+    proc = subprocess.Popen([sys.executable, "serve.py", "--socket", path] + SERVER_ARGS)
+    for _ in range(300):
+        try:
+            with socket.socket(socket.AF_UNIX) as s:
+                s.connect(path)
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("serve.py did not come up")
+
+def client(path, jobs, lock, latencies, statuses, timeout):
+    with socket.socket(socket.AF_UNIX) as s:
+        s.connect(path)
+        reader = s.makefile("r", encoding="utf-8")
+        while True:
+            with lock:
+                job = next(jobs, None)
+            if job is None:
+                return
+            req_id, grid = job
+            t = time.perf_counter()
+            s.sendall((json.dumps({"id": req_id, "grid": grid, "timeout": timeout}) + "\n").encode())
+            answer = json.loads(reader.readline())
+            latency = time.perf_counter() - t
+            with lock:
+                latencies.append(latency)
+                statuses[answer["status"]] += 1
+
+def main_py_time(grids, runs):
+    """mean seconds of one main.py call per puzzle (interpreter start + imports + encode + solve)"""
+    path = "/tmp/serve_benchmark_puzzle.txt"
+    times = []
+    for grid in grids[:runs]:
+        with open(path, "w") as f:
+            f.write("\n".join(" ".join(map(str, row)) for row in grid) + "\n")
+        t = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--in", path, "--mode", "cdcl", "--heuristic", "vsids"],
+                       capture_output=True)
+        times.append(time.perf_counter() - t)
+    return sum(times) / len(times) if times else None
+
+def run_tests():
+    args = parse_args()
+    grids = []
+    for grid, N, B in parse_file(args.puzzles):
+        grids.append(grid)
+        if len(grids) >= args.requests:
+            break
+    if not grids:
+        print(f"no puzzles in {args.puzzles}")
+        return
+
+    server = None
+    if not os.path.exists(args.socket):
+        server = start_server(args.socket)
+    try:
+        jobs = iter([(i, grids[i % len(grids)]) for i in range(args.requests)])
+        lock = threading.Lock()
+        latencies, statuses = [], Counter()
+        threads = [threading.Thread(target=client, args=(args.socket, jobs, lock, latencies, statuses, args.timeout))
+                   for _ in range(args.concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{len(latencies)} requests | {args.concurrency} clients | {elapsed:.2f}s | {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50: {percentile(latencies, 50) * 1000:.1f}ms | p95: {percentile(latencies, 95) * 1000:.1f}ms"
+          f" | p99: {percentile(latencies, 99) * 1000:.1f}ms | max: {max(latencies) * 1000:.1f}ms")
+    print("results: " + ", ".join(f"{k} {v}" for k, v in sorted(statuses.items())))
+    if args.main_py_runs:
+        per_call = main_py_time(grids, args.main_py_runs)
+        print(f"main.py per puzzle (one process each, {args.main_py_runs} puzzles): {per_call * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    run_tests()
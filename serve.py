@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Solver service: puzzles in, answers out, without paying for a new interpreter per puzzle.
+
+Usage:
+  python serve.py                                  (requests on stdin, answers on stdout)
+  python serve.py --socket /tmp/sudoku.sock --workers 4
+
+One JSON object per line each way (NDJSON). A request:
+    {"id": 7, "puzzle": "....23...8.....4..."}           compact puzzle, or
+    {"id": 7, "grid": [[1, 0, ...], ...]}                N x N numbers, 0 = empty
+  optional: "timeout" (seconds, capped at --max-timeout), "mode", "heuristic", "restarts",
+            "standard_only" (no non-consecutive rule), "check" (verify the solution)
+The answer, in the order the solves finish (match them up by id):
+    {"id": 7, "status": "SAT", "solution": [[...]], "stats": {...}, "time": 0.012}
+status is SAT, UNSAT, UNKNOWN (the time budget ran out, stats show how far the search got),
+INVALID (with "check": the solution broke a rule), TIMEOUT or ERROR (with "error").
+solution is only there for SAT/INVALID, stats not for TIMEOUT/ERROR.
+
+The solves run on a WorkerPool, so encoder and solver are imported once per worker
+and the base formula of each size is built once per worker (--warm builds them up
+front). The timeout is the solver's own time limit; only a worker still busy worker_pool.KILL_GRACE
+seconds after it (TIMEOUT) is killed and replaced.
+"""
+
+import argparse
+import json
+import math
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from encoder import parse_compact, grid_to_cnf, base_formula, decode_model, check_solution
+from worker_pool import KILL_GRACE, WorkerPool
+import solver
+
+MODES = ("dpll", "cdcl", "portfolio", "split")
+HEURISTICS = ("standard", "mom", "jw", "vsids")
+RESTART_POLICIES = ("luby", "geometric", "lbd")
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--socket", default=None, help="Listen on this Unix socket instead of stdin/stdout")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Puzzles solved at the same time")
+    p.add_argument("--timeout", type=float, default=10, help="Seconds per request when it does not say")
+    p.add_argument("--max-timeout", type=float, default=120, help="Upper limit for a request's own timeout")
+    p.add_argument("--mode", choices=MODES, default="cdcl", help="Default search mode")
+    p.add_argument("--heuristic", choices=HEURISTICS, default="vsids", help="Default branching heuristic")
+    p.add_argument("--warm", default="9", help="Comma-separated sizes whose base formula every worker builds at startup ('' = none)")
+    return p.parse_args()
+
+def solve_request(grid, N, B, opts, timeout=None):
+    """
+    runs inside a worker: one puzzle -> (status, solution or None, stats dict)
+    grid None is a warm-up: N is then a list of sizes whose base formulas get built
+    """
+    if grid is None:
+        for n in N:
+            base_formula(n, math.isqrt(n), True)
+        return "WARM", None, None
+    use_nc_rule = not opts["standard_only"]
+    clauses, num_vars = grid_to_cnf(grid, N, B, use_non_consecutive=use_nc_rule)
+    status, model, stats = solver.solve_cnf(clauses, num_vars, mode=opts["mode"], heuristic=opts["heuristic"],
+                                            restarts=opts["restarts"], time_limit=timeout)
+    solution = None
+    if model is not None:
+        solution = decode_model(model, N)
+        if opts["check"] and check_solution(solution, N, B, use_non_consecutive=use_nc_rule, givens=grid):
+            status = "INVALID"
+    return status, solution, stats.as_dict()
+
+def read_request(req: dict, args) -> Tuple[Tuple, float]:
+    """(job for solve_request, timeout) from a request; ValueError if something is off"""
+    if "puzzle" in req:
+        puzzle = parse_compact(str(req["puzzle"]))
+        if puzzle is None:
+            raise ValueError("puzzle is not a compact N*N puzzle")
+        grid, N, B = puzzle
+    elif "grid" in req:
+        grid = req["grid"]
+        N = len(grid) if isinstance(grid, list) else 0
+        B = math.isqrt(N)
+        if N < 4 or B * B != N or not all(isinstance(row, list) and len(row) == N and
+                                          all(isinstance(v, int) and 0 <= v <= N for v in row) for row in grid):
+            raise ValueError("grid must be N x N numbers in 0..N with N a square")
+    else:
+        raise ValueError("request needs a puzzle or a grid")
+
+    opts = {"mode": req.get("mode", args.mode), "heuristic": req.get("heuristic", args.heuristic),
+            "restarts": req.get("restarts"), "standard_only": bool(req.get("standard_only", False)),
+            "check": bool(req.get("check", False))}
+    for key, allowed in (("mode", MODES), ("heuristic", HEURISTICS), ("restarts", RESTART_POLICIES + (None,))):
+        if opts[key] not in allowed:
+            raise ValueError(f"{key} must be one of {', '.join(a for a in allowed if a)}")
+    timeout = req.get("timeout", args.timeout)
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        raise ValueError("timeout must be a positive number of seconds")
+    timeout = min(float(timeout), args.max_timeout)
+    return (grid, N, B, opts, timeout), timeout
+
+
+class _Client:
+    """one connection (or stdin/stdout); requests are read on its own thread, answers written by the main loop"""
+
+    def __init__(self, reader, writer, conn: Optional[socket.socket] = None):
+        self.reader = reader
+        self.writer = writer
+        self.conn = conn #None for stdin/stdout
+        self.outstanding = 0 #requests without an answer yet
+        self.eof = False
+
+    def send(self, answer: dict) -> None:
+        try:
+            self.writer.write(json.dumps(answer) + "\n")
+            self.writer.flush()
+        except (BrokenPipeError, OSError):
+            pass #client went away, its remaining answers go nowhere
+
+    def close(self) -> None:
+        if self.conn is not None:
+            for f in (self.reader, self.writer, self.conn):
+                try:
+                    f.close()
+                except OSError:
+                    pass
+
+
+def _read_lines(client: _Client, inbox: "queue.Queue", wake_w: int) -> None:
+    for line in client.reader:
+        inbox.put((client, line))
+        os.write(wake_w, b"x")
+    inbox.put((client, None))
+    os.write(wake_w, b"x")
+
+def _accept(server: socket.socket, inbox: "queue.Queue", wake_w: int) -> None:
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return #server socket closed
+        reader = conn.makefile("r", encoding="utf-8")
+        writer = conn.makefile("w", encoding="utf-8")
+        client = _Client(reader, writer, conn)
+        threading.Thread(target=_read_lines, args=(client, inbox, wake_w), daemon=True).start()
+
+def serve(args) -> None:
+    inbox: "queue.Queue" = queue.Queue()
+    #the reader threads write a byte here after every line, so the main loop wakes up
+    #from pool.completed() to hand new requests to idle workers
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    server = None
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(args.socket)
+        server.listen(128)
+        threading.Thread(target=_accept, args=(server, inbox, wake_w), daemon=True).start()
+        print(f"listening on {args.socket} | workers: {args.workers}", file=sys.stderr)
+    else:
+        #a file object of our own: multiprocessing closes sys.stdin in every worker it forks, which
+        #would deadlock on the lock the reader thread holds while it waits for input
+        stdio = _Client(open(os.dup(sys.stdin.fileno()), encoding="utf-8"), sys.stdout)
+        threading.Thread(target=_read_lines, args=(stdio, inbox, wake_w), daemon=True).start()
+
+    running: Dict[int, Tuple[_Client, object, float]] = {} # job id -> (client, request id, received at)
+    with WorkerPool(solve_request, workers=args.workers, quiet=True) as pool:
+        sizes = [int(size) for size in args.warm.split(",") if size]
+        if sizes:
+            #all workers are idle, so each one gets one of these
+            for _ in pool.workers:
+                pool.submit((None, sizes, None, None))
+        try:
+            while True:
+                while True:
+                    try:
+                        client, line = inbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    if line is None:
+                        client.eof = True
+                        if client.outstanding == 0 and _done(client, server):
+                            return
+                    elif line.strip():
+                        _take(line, client, pool, running, args)
+
+                for job_id, status, value, seconds in pool.completed(also=[wake_r]):
+                    if job_id not in running:
+                        continue #warm-up
+                    client, req_id, received = running.pop(job_id)
+                    answer = {"id": req_id, "status": status.upper()}
+                    if status == "ok":
+                        answer["status"], answer["solution"], answer["stats"] = value
+                        if answer["solution"] is None:
+                            del answer["solution"]
+                    elif status == "error":
+                        answer["status"], answer["error"] = "ERROR", value
+                    answer["time"] = round(time.monotonic() - received, 6)
+                    client.send(answer)
+                    client.outstanding -= 1
+                    if client.eof and client.outstanding == 0 and _done(client, server):
+                        return
+                try:
+                    os.read(wake_r, 4096)
+                except BlockingIOError:
+                    pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if server is not None:
+                server.close()
+                os.unlink(args.socket)
+
+def _take(line: str, client: _Client, pool: WorkerPool, running: dict, args) -> None:
+    """a request line: on to the pool, or an ERROR answer right away"""
+    received = time.monotonic()
+    req_id = None
+    try:
+        req = json.loads(line)
+        if not isinstance(req, dict):
+            raise ValueError("request must be a JSON object")
+        req_id = req.get("id")
+        job, timeout = read_request(req, args)
+    except ValueError as e: #json.JSONDecodeError included
+        client.send({"id": req_id, "status": "ERROR", "error": str(e), "time": 0.0})
+        return
+    running[pool.submit(job, timeout=timeout + KILL_GRACE)] = (client, req_id, received)
+    client.outstanding += 1
+
+def _done(client: _Client, server: Optional[socket.socket]) -> bool:
+    """a client finished: close it; True if that was stdin, which ends the server"""
+    client.close()
+    return server is None
+
+def main():
+    args = parse_args()
+    #SIGTERM ends the server like Ctrl-C, so the socket file gets removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    serve(args)
+
+if __name__ == "__main__":
+    main()
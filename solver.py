@@ -3,81 +3,604 @@ SAT Assignment Part 2 - Non-consecutive Sudoku Solver (Puzzle -> SAT/UNSAT)
 
 THIS is the file to edit.
 
-Implement: solve_cnf(clauses) -> (status, model_or_None)
+Implement: solve_cnf(clauses, num_vars, ...) -> (status, model_or_None, stats)
+    status is "SAT", "UNSAT" or "UNKNOWN" (time_limit / conflict_limit / decision_limit ran out),
+    stats a SolverStats; see solve_cnf for the keywords.
 """
 
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+from array import array
+from collections import deque
+from multiprocessing.connection import wait
 from typing import Iterable, List, Tuple, Dict, Optional
 
-#if you want to change to "standard", "mom", or "jw" select here
+from clause_store import ClauseStore
+from worker_pool import WorkerPool
+
+#if you want to change to "standard", "mom", "jw" or "vsids" select here
 HEURISTIC = "mom" 
+#search mode: "dpll" (chronological backtracking), "cdcl" (1UIP clause learning + backjumping)
+#"portfolio" (race the PORTFOLIO configurations below in parallel processes)
+#or "split" (cube and conquer over SPLIT_WORKERS processes, see the SPLIT_ settings)
+MODE = "dpll"
 BACKTRACK_COUNT = 0
+CONFLICT_COUNT = 0
+#literals fixed by unit propagation before the first decision (set by solve_cnf)
+INITIAL_PROPS = 0
+RESTART_COUNT = 0
+#learnt clauses / nogoods: stored, deleted again by the size cap, and used in a conflict
+NOGOODS_RECORDED = 0
+NOGOODS_PRUNED = 0
+NOGOODS_HIT = 0
+#the counters above mirror the SolverStats of the last solve (module global -> stats field);
+#read the stats solve_cnf returns instead, these are shared by every solve in the process
+_COUNTERS = {"BACKTRACK_COUNT": "backtracks", "CONFLICT_COUNT": "conflicts", "INITIAL_PROPS": "initial_props",
+             "RESTART_COUNT": "restarts", "NOGOODS_RECORDED": "nogoods_recorded",
+             "NOGOODS_PRUNED": "nogoods_pruned", "NOGOODS_HIT": "nogoods_hit"}
+#opt-in profiling: a file name here (or in the SOLVER_PROFILE environment variable) makes solve_cnf run
+#under cProfile and write the per-function timings of all calls there at exit (pstats text, or the raw profile for *.prof).
+#Only this process is profiled, the portfolio/split workers are not.
+PROFILE: Optional[str] = os.environ.get("SOLVER_PROFILE") or None
 
 
 #pre-calculating the weights for clause lengths 0 to 100 (hoping to solve the search optimization issue ,less computational power used)
-JW_WEIGHTS = [2.0 ** (-i) for i in range(100)] 
-
-def _choose_jw(clauses, assignment):
-    scores = {}
-    for c in clauses:
-        #another optimization trieed her: pre-calculated list instead of math.pow
-        length = len(c)
-        if length < 100:
-            w = JW_WEIGHTS[length]
-        else:
-            w = 2.0 ** (-length) #implemented a fallback for huge clauses
-            
-        for lit in c:
-            v = abs(lit)
-            if v not in assignment:
-                scores[v] = scores.get(v, 0) + w
-    
-    if not scores: return _choose_standard(clauses, assignment)
+#stored as 2^-i scaled by 2^99 so the incremental JW scores are exact integers (adding and removing never drifts)
+JW_WEIGHTS = [1 << (99 - i) for i in range(100)] 
+#VSIDS activity decay per conflict
+VSIDS_DECAY = 0.95
 
+#restart policy: None (never), "luby", "geometric" or "lbd" (glucose-style, cdcl only)
+RESTARTS: Optional[str] = None
+#luby: RESTART_BASE * luby(i) conflicts per run, geometric: RESTART_BASE * RESTART_GROWTH^i
+RESTART_BASE = 100
+RESTART_GROWTH = 1.5
+#lbd: restart when the average LBD of the last LBD_WINDOW conflicts times LBD_K is above the overall average
+LBD_WINDOW = 50
+LBD_K = 0.8
+#with restarts on, decisions reuse the polarity a variable had before it was last unassigned
+PHASE_SAVING = True
 
-def _simplify(clauses: List[List[int]], lit: int) -> Optional[List[List[int]]]:
-    new_clauses = []
-    neg = -lit
+#dpll: record the decisions behind every conflict as a nogood clause (cdcl always keeps its learnt clauses)
+#default for solve_cnf's nogoods argument; off, so dpll searches exactly as in the results_* runs
+NOGOODS = False
+#learnt clause / nogood cap: above either limit the store is cut back to half of it (high LBD, low activity go first)
+NOGOOD_MAX_CLAUSES = 10000
+NOGOOD_MAX_LITERALS = 1000000
+#clauses that are a reason cannot go; if they alone keep the store near the cap, the next
+#reduction waits until it has grown by this factor instead of running on every conflict
+NOGOOD_GROWTH = 1.5
+#activity decay per conflict for the learnt clauses
+NOGOOD_DECAY = 0.999
 
-    for clause in clauses:
-        if lit in clause:
-            continue
+#portfolio members: (name, mode, heuristic, seed). A seed makes the heuristic break ties at
+#random and pick the decision polarity at random, so equal heuristics still search differently
+PORTFOLIO = [
+    ("mom", "dpll", "mom", None),
+    ("jw", "dpll", "jw", None),
+    ("standard", "dpll", "standard", None),
+    ("cdcl-vsids", "cdcl", "vsids", None),
+    ("mom-rand1", "dpll", "mom", 1),
+    ("jw-rand2", "dpll", "jw", 2),
+    ("cdcl-vsids-rand3", "cdcl", "vsids", 3),
+]
+#name of the configuration that answered first in the last portfolio solve (None outside portfolio mode)
+PORTFOLIO_WINNER: Optional[str] = None
 
-        if neg in clause:
-            new_clause = [x for x in clause if x != neg]
-            if not new_clause:
-                return None
-            new_clauses.append(new_clause)
+#split mode: decisions per cube, heuristic that picks the cube variables, processes,
+#how each cube is searched, and the conflicts a cube gets before it is split again
+SPLIT_DEPTH = 4
+SPLIT_HEURISTIC = "mom"
+SPLIT_WORKERS = os.cpu_count() or 1
+SPLIT_MODE = "cdcl"
+SPLIT_CONFLICT_LIMIT = 1000
+
+
+class SolverStats:
+    """
+    Counters and timings of one solve (times in seconds), returned by solve_cnf.
+    propagate_time / choose_time: inside unit propagation / the branching heuristic's pick
+    simplify_time: loading + level-0 propagation of the input, and learnt clause reduction
+    nogoods_recorded: learnt clauses (cdcl) or nogoods (dpll), units included in both modes
+    """
+    __slots__ = ("decisions", "propagations", "conflicts", "backtracks", "restarts", "initial_props",
+                 "nogoods_recorded", "nogoods_pruned", "nogoods_hit",
+                 "propagate_time", "choose_time", "simplify_time", "solve_time", "winner")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.winner: Optional[str] = None  # portfolio member that answered
+
+    def add(self, other: "SolverStats") -> None:
+        """sum in the numbers of another solve (split mode: one per cube)"""
+        for name in self.__slots__:
+            if name != "winner":
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return "SolverStats(" + ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()) + ")"
+
+def _publish(stats: SolverStats) -> None:
+    """copy a solve's stats into the module counters"""
+    global PORTFOLIO_WINNER
+    for name, field in _COUNTERS.items():
+        globals()[name] = getattr(stats, field)
+    PORTFOLIO_WINNER = stats.winner
+
+class _Engine:
+    """
+    Clause database + assignment trail with two watched literals per clause.
+
+    Assigning a literal only visits the clauses that watch its negation, so
+    propagation no longer rebuilds the clause list on every assignment.
+    Clauses live in a flat ClauseStore and are never reordered (the heuristics
+    scan them in their original order); w0/w1 hold the absolute arena
+    positions of the two watched literals instead.
+    """
+
+    def __init__(self, num_vars: int):
+        self.num_vars = num_vars
+        size = 2 * num_vars + 1
+        #literal-indexed lists: lit in [-n, n], negative literals wrap around to the back half
+        self.value = [0] * size                      # 1 = true, -1 = false, 0 = unassigned
+        self.watches: List[array] = [array('i') for _ in range(size)]
+        self.db = ClauseStore()
+        self.w0 = array('i')
+        self.w1 = array('i')
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []               # trail index where each decision level starts
+        self.qhead = 0
+        self.ok = True
+        #per variable: decision level and the clause that implied it (-1 = decision / input unit)
+        self.level = [0] * (num_vars + 1)
+        self.reason = [-1] * (num_vars + 1)
+        self.seen = bytearray(num_vars + 1)
+        #branching heuristic, attached by solve_cnf once the input clauses are loaded
+        self.heuristic: Optional["_Heuristic"] = None
+        #set for randomized runs: random tie-breaking in the heuristics + random decision polarity
+        self.rng: Optional[random.Random] = None
+        #stop the search (result None) once stats.conflicts / stats.decisions reach these or
+        #time.monotonic() passes the deadline, None = no limit; set through set_limits
+        self.conflict_budget: Optional[int] = None
+        self.decision_budget: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.limited = False
+        #restart schedule and saved phases (per variable: 0 = none yet, 1 = true, 2 = false), set by _run
+        self.restarts: Optional["_Restarts"] = None
+        self.phase: Optional[bytearray] = None
+        #learnt clauses / nogoods bookkeeping, set by _run
+        self.nogoods: Optional["_NogoodStore"] = None
+        self.stats = SolverStats()
+
+    def _watch(self, ci: int) -> None:
+        s = self.db.start[ci]
+        self.w0.append(s)
+        self.w1.append(s + 1)
+        self.watches[self.db.lits[s]].append(ci)
+        self.watches[self.db.lits[s + 1]].append(ci)
+
+    def add_clause(self, lits: Iterable[int]) -> None:
+        """add an input clause (level 0 only); units go straight onto the trail"""
+        clause = list(dict.fromkeys(lits))
+        seen = set(clause)
+        for lit in clause:
+            if -lit in seen:
+                return  # tautology
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            lit = clause[0]
+            if self.value[lit] == -1:
+                self.ok = False
+            elif self.value[lit] == 0:
+                self._enqueue(lit)
         else:
-            new_clauses.append(clause)
+            self._watch(self.db.add(clause))
 
-    return new_clauses
+    def load(self, clauses: Iterable[Iterable[int]]) -> None:
+        """add all input clauses; a ClauseStore is copied over in bulk instead of clause by clause"""
+        if not isinstance(clauses, ClauseStore) or len(self.db):
+            for c in clauses:
+                self.add_clause(c)
+            return
 
-#helper for unit propagation
-def _unit_propagate(clauses: List[List[int]], assignment: Dict[int, bool]) -> Tuple[Optional[List[List[int]]], bool]:
-    while True:
-        unit_lit = None
+        #only clauses of length >= 2 without repeated literals are kept in the arena;
+        #the rest are blanked (size 0, never watched) and go through add_clause
+        db = self.db
+        db.lits = array('i', clauses.lits)
+        db.start = array('i', clauses.start)
+        db.size = array('i', clauses.size)
+        lits = db.lits
+        size = db.size
+        w0 = self.w0
+        w1 = self.w1
+        watches = self.watches
+        odd = []
+        for ci, s in enumerate(db.start):
+            n = size[ci]
+            a = lits[s] if n else 0
+            b = lits[s + 1] if n > 1 else 0
+            if n < 2 or a == b or a == -b or (n > 2 and len(set(lits[s:s + n])) < n):
+                odd.append(ci)
+                w0.append(s)
+                w1.append(s)
+                continue
+            w0.append(s)
+            w1.append(s + 1)
+            watches[a].append(ci)
+            watches[b].append(ci)
+        for ci in odd:
+            s = db.start[ci]
+            clause = lits[s:s + size[ci]]
+            size[ci] = 0
+            self.add_clause(clause)
+
+    def clause(self, ci: int) -> array:
+        return self.db[ci]
+
+    def _enqueue(self, lit: int, reason: int = -1) -> None:
+        self.value[lit] = 1
+        self.value[-lit] = -1
+        v = abs(lit)
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    def model(self) -> bytearray:
+        """model[v] = 1 if v is true, else 0 (index 0 unused); unassigned variables are free, they get 0"""
+        value = self.value
+        return bytearray(1 if value[v] == 1 else 0 for v in range(self.num_vars + 1))
+
+    def set_limits(self, conflicts: Optional[int] = None, decisions: Optional[int] = None,
+                   deadline: Optional[float] = None) -> None:
+        self.conflict_budget = conflicts
+        self.decision_budget = decisions
+        self.deadline = deadline
+        self.limited = conflicts is not None or decisions is not None or deadline is not None
+
+    def out_of_budget(self) -> bool:
+        """checked by the search loops at every conflict and decision (only when self.limited)"""
+        stats = self.stats
+        return ((self.conflict_budget is not None and stats.conflicts >= self.conflict_budget)
+                or (self.decision_budget is not None and stats.decisions >= self.decision_budget)
+                or (self.deadline is not None and time.monotonic() >= self.deadline))
 
-        for clause in clauses:
-            if len(clause) == 0:
-                return None, False
-            if len(clause) == 1:
-                unit_lit = clause[0]
+    def decide(self, lit: int) -> None:
+        self.stats.decisions += 1
+        self.trail_lim.append(len(self.trail))
+        self._enqueue(lit)
+
+    def new_level(self) -> None:
+        """open a decision level without deciding anything (an assumption that is already true)"""
+        self.trail_lim.append(len(self.trail))
+
+    def backtrack(self, level: int) -> None:
+        """undo every assignment above the given decision level"""
+        if len(self.trail_lim) <= level:
+            return
+        value = self.value
+        start = self.trail_lim[level]
+        if self.heuristic is not None:
+            self.heuristic.on_backtrack(self, start)
+        phase = self.phase
+        for lit in self.trail[start:]:
+            value[lit] = 0
+            value[-lit] = 0
+            if phase is not None:
+                phase[abs(lit)] = 1 if lit > 0 else 2
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def lbd(self, lits: Iterable[int]) -> int:
+        """literal block distance: number of different decision levels among lits"""
+        level = self.level
+        return len({level[abs(q)] for q in lits})
+
+    def propagate(self) -> Optional[int]:
+        """unit propagation over the watch lists, returns the conflicting clause index (None if no conflict)"""
+        stats = self.stats
+        before = len(self.trail)
+        t = time.perf_counter()
+        confl = self._propagate()
+        stats.propagate_time += time.perf_counter() - t
+        stats.propagations += len(self.trail) - before
+        return confl
+
+    def _propagate(self) -> Optional[int]:
+        value = self.value
+        level = self.level
+        reason = self.reason
+        cur_level = len(self.trail_lim)
+        watches = self.watches
+        lits = self.db.lits
+        start = self.db.start
+        size = self.db.size
+        w0 = self.w0
+        w1 = self.w1
+        trail = self.trail
+
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            ws = watches[false_lit]
+            n = len(ws)
+            i = j = 0
+
+            while i < n:
+                ci = ws[i]
+                i += 1
+                a = w0[ci]
+                b = w1[ci]
+                first = lits[a] == false_lit
+                other = lits[b] if first else lits[a]
+
+                if value[other] == 1:
+                    ws[j] = ci
+                    j += 1
+                    continue
+
+                #look for a replacement watch that is not false
+                s = start[ci]
+                for k in range(s, s + size[ci]):
+                    if k != a and k != b and value[lits[k]] != -1:
+                        if first:
+                            w0[ci] = k
+                        else:
+                            w1[ci] = k
+                        watches[lits[k]].append(ci)
+                        break
+                else:
+                    ws[j] = ci
+                    j += 1
+                    if value[other] == -1:
+                        #conflict: keep the rest of the watch list and stop
+                        while i < n:
+                            ws[j] = ws[i]
+                            j += 1
+                            i += 1
+                        del ws[j:]
+                        self.qhead = len(trail)
+                        return ci
+                    value[other] = 1
+                    value[-other] = -1
+                    v = other if other > 0 else -other
+                    level[v] = cur_level
+                    reason[v] = ci
+                    trail.append(other)
+
+            del ws[j:]
+
+        return None
+
+    def analyze(self, confl: int) -> Tuple[List[int], int]:
+        """
+        1UIP conflict analysis: walks the trail backwards resolving reasons until
+        one literal of the current level is left. Returns the learnt clause
+        (asserting literal first, highest remaining level second) and the level to jump back to.
+        """
+        db = self.db
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        trail = self.trail
+        cur_level = len(self.trail_lim)
+        bump = self.heuristic.bump if self.heuristic is not None else None
+
+        nogoods = self.nogoods
+
+        learnt = [0]
+        pending = 0
+        p = 0
+        idx = len(trail) - 1
+        ci = confl
+        while True:
+            if nogoods is not None and ci >= nogoods.first:
+                nogoods.touch(ci)
+            for q in db[ci]:
+                if q == p:
+                    continue
+                v = abs(q)
+                if not seen[v] and level[v] > 0:
+                    seen[v] = 1
+                    if bump is not None:
+                        bump(v)
+                    if level[v] >= cur_level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+            #next seen literal on the trail
+            while not seen[abs(trail[idx])]:
+                idx -= 1
+            p = trail[idx]
+            idx -= 1
+            seen[abs(p)] = 0
+            pending -= 1
+            if pending == 0:
                 break
+            ci = reason[abs(p)]
 
-        if unit_lit is None:
-            return clauses, True
+        learnt[0] = -p
 
-        var = abs(unit_lit)
-        val = (unit_lit > 0)
+        #local minimization: drop literals whose reason is already covered by the clause
+        kept = [learnt[0]]
+        for q in learnt[1:]:
+            r = reason[abs(q)]
+            if r == -1:
+                kept.append(q)
+                continue
+            for x in db[r]:
+                v = abs(x)
+                if v != abs(q) and not seen[v] and level[v] > 0:
+                    kept.append(q)
+                    break
+        for q in learnt[1:]:
+            seen[abs(q)] = 0
+        learnt = kept
 
-        if var in assignment and assignment[var] != val:
-            return None, False
-        assignment[var] = val
+        if len(learnt) == 1:
+            return learnt, 0
+        best = 1
+        for k in range(2, len(learnt)):
+            if level[abs(learnt[k])] > level[abs(learnt[best])]:
+                best = k
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def learn(self, learnt: List[int]) -> int:
+        """store a learnt clause (after backjumping) and assert its first literal; returns its index (-1 for a unit)"""
+        if len(learnt) == 1:
+            self._enqueue(learnt[0])
+            return -1
+        ci = self.db.add(learnt)
+        self._watch(ci)
+        if self.heuristic is not None:
+            self.heuristic.on_learn(self, ci)
+        self._enqueue(learnt[0], ci)
+        return ci
+
+    def decision_nogood(self, confl: int) -> List[int]:
+        """
+        The negated decisions the conflict depends on, found by walking the implication
+        graph back from the conflicting clause. Most recent decision first.
+        """
+        db = self.db
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        trail = self.trail
+        nogoods = self.nogoods
+
+        marked = []
+        for q in db[confl]:
+            v = abs(q)
+            if level[v] > 0 and not seen[v]:
+                seen[v] = 1
+                marked.append(v)
+        if nogoods is not None and confl >= nogoods.first:
+            nogoods.touch(confl)
+
+        out = []
+        for i in range(len(trail) - 1, self.trail_lim[0] - 1, -1):
+            lit = trail[i]
+            v = abs(lit)
+            if not seen[v]:
+                continue
+            r = reason[v]
+            if r == -1:
+                out.append(-lit)
+                continue
+            if nogoods is not None and r >= nogoods.first:
+                nogoods.touch(r)
+            for q in db[r]:
+                u = abs(q)
+                if level[u] > 0 and not seen[u]:
+                    seen[u] = 1
+                    marked.append(u)
+        for v in marked:
+            seen[v] = 0
+        return out
+
+    def assumption_core(self, lit: int) -> List[int]:
+        """
+        lit is an assumption that is already false: the assumptions (decisions on the trail)
+        that imply -lit, plus lit itself. Together they contradict the clauses.
+        """
+        core = [lit]
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        if level[abs(lit)] == 0:
+            return core
+        seen[abs(lit)] = 1
+        trail = self.trail
+        for i in range(len(trail) - 1, self.trail_lim[0] - 1, -1):
+            v = abs(trail[i])
+            if not seen[v]:
+                continue
+            r = reason[v]
+            if r == -1:
+                core.append(trail[i])
+            else:
+                for q in self.db[r]:
+                    if level[abs(q)] > 0:
+                        seen[abs(q)] = 1
+            seen[v] = 0
+        return core
+
+    def add_learnt(self, lits: List[int]) -> int:
+        """
+        Attach a learnt clause (length >= 2) under any assignment: the watches go to true or
+        unassigned literals first, then to the most recently assigned false ones. If that
+        leaves it unit, its free literal is propagated. Returns the clause index.
+        """
+        value = self.value
+        level = self.level
+        lits = sorted(lits, key=lambda q: (value[q] == -1, -level[abs(q)]))
+        ci = self.db.add(lits)
+        self._watch(ci)
+        if self.heuristic is not None:
+            self.heuristic.on_learn(self, ci)
+        if value[lits[0]] == 0 and value[lits[1]] == -1:
+            self._enqueue(lits[0], ci)
+        return ci
+
+    def reduce_db(self, first: int, keep: List[int]) -> Dict[int, int]:
+        """
+        Delete every learnt clause (index >= first) that is not in keep and compact the arena,
+        renumbering the kept ones in order. keep must contain every clause that is the reason
+        of an assigned literal. Returns old index -> new index for the kept clauses.
+        """
+        db = self.db
+        lits, start, size = db.lits, db.start, db.size
+        w0, w1 = self.w0, self.w1
+        keep_set = set(keep)
+        if self.heuristic is not None:
+            for ci in range(first, len(db)):
+                if ci not in keep_set:
+                    self.heuristic.on_delete(self, ci)
+
+        saved = []
+        for ci in sorted(keep_set):
+            s = start[ci]
+            saved.append((ci, lits[s:s + size[ci]], w0[ci] - s, w1[ci] - s))
+        if first < len(db):
+            del lits[start[first]:]
+        del start[first:]
+        del size[first:]
+        del w0[first:]
+        del w1[first:]
+
+        mapping: Dict[int, int] = {}
+        for ci, clause, a, b in saved:
+            nci = db.add(clause)
+            s = start[nci]
+            w0.append(s + a)
+            w1.append(s + b)
+            mapping[ci] = nci
+
+        watches = self.watches
+        for i, wl in enumerate(watches):
+            if wl and max(wl) >= first:
+                watches[i] = array('i', [c if c < first else mapping[c] for c in wl if c < first or c in mapping])
+        reason = self.reason
+        for v in range(1, self.num_vars + 1):
+            if reason[v] >= first:
+                reason[v] = mapping.get(reason[v], -1)
+        if self.heuristic is not None:
+            self.heuristic.on_renumber(self, first, mapping)
+        return mapping
 
-        clauses = _simplify(clauses, unit_lit)
-        if clauses is None:
-            return None, False
-        
 
 ############################################# :)
 #
@@ -87,141 +610,1093 @@ def _unit_propagate(clauses: List[List[int]], assignment: Dict[int, bool]) -> Tu
 #
 ############## :(
 
-def _choose_standard(clauses: List[List[int]], assignment: Dict[int, bool]) -> Optional[int]:
-    """choose the first unassigned variable that is found"""
-    for clause in clauses:
+class _Heuristic:
+    """branching heuristic interface; the engine calls the hooks, _choose_var calls pick"""
+
+    name = "standard"
+
+    def pick(self, engine: _Engine) -> Optional[int]:
+        raise NotImplementedError
+
+    def on_backtrack(self, engine: _Engine, start: int) -> None:
+        """trail[start:] is about to be undone"""
+
+    def on_learn(self, engine: _Engine, ci: int) -> None:
+        """engine.db[ci] was just added"""
+
+    def on_delete(self, engine: _Engine, ci: int) -> None:
+        """learnt clause engine.db[ci] is about to be deleted"""
+
+    def on_renumber(self, engine: _Engine, first: int, mapping: Dict[int, int]) -> None:
+        """after deletions the learnt clauses from index `first` on were renumbered (old -> new)"""
+
+    def bump(self, v: int) -> None:
+        """v took part in a conflict"""
+
+    def decay(self) -> None:
+        """called once per conflict"""
+
+
+class _StandardHeuristic(_Heuristic):
+    def pick(self, engine: _Engine) -> Optional[int]:
+        if engine.rng is not None:
+            return _choose_standard_random(engine)
+        return _choose_standard(engine)
+
+
+def _choose_standard(engine: _Engine) -> Optional[int]:
+    """choose the first unassigned variable that is found in a clause that is not satisfied yet"""
+    value = engine.value
+    for clause in engine.db:
+        first = 0
         for lit in clause:
-            v = abs(lit)
-            if v not in assignment:
-                return v
+            val = value[lit]
+            if val == 1:
+                break
+            if val == 0 and not first:
+                first = lit
+        else:
+            if first:
+                return abs(first)
+    return None
+
+
+def _choose_standard_random(engine: _Engine) -> Optional[int]:
+    """same clause as _choose_standard, but a random unassigned variable out of it"""
+    value = engine.value
+    for clause in engine.db:
+        free = []
+        for lit in clause:
+            val = value[lit]
+            if val == 1:
+                break
+            if val == 0:
+                free.append(lit)
+        else:
+            if free:
+                return abs(engine.rng.choice(free))
     return None
 
-def _choose_mom(clauses: List[List[int]], assignment: Dict[int, bool]) -> Optional[int]:
-    """maximum occurances in mimimum length clauses"""
-    #find the shortest clause length
-    min_len = float('inf')
-    for c in clauses:
-        if len(c) < min_len:
-            min_len = len(c)
-    
-    #count variables in those shortest clauses
-    counts = {}
-    for c in clauses:
-        if len(c) == min_len:
-            for lit in c:
+
+class _ClauseCounters(_Heuristic):
+    """
+    Incrementally maintained MOM / JW scores.
+
+    Instead of rebuilding a score dict over every clause at every decision,
+    each clause keeps its number of true and unassigned literals. The trail is
+    replayed into the counters lazily (only the part added since the last
+    decision), and undone in reverse on backtrack, so the cost per assignment is
+    the size of the clauses the variable occurs in.
+
+    mom: by_len[L][v] = number of open clauses with L unassigned literals containing v
+    jw:  jw[v] = sum over open clauses containing v of JW_WEIGHTS[L]
+    """
+
+    def __init__(self, engine: _Engine, kind: str):
+        self.kind = kind
+        self.name = kind
+        size = 2 * engine.num_vars + 1
+        self.cval = [0] * size                       # assignment as the counters have seen it so far
+        self.occ: List[array] = [array('i') for _ in range(size)]
+        self.n_true: List[int] = []
+        self.n_free: List[int] = []
+        self.by_len: List[Dict[int, int]] = [{}]
+        self.jw: Dict[int, int] = {}
+        self.done = 0                                # trail prefix already replayed
+        for ci in range(len(engine.db)):
+            self.on_learn(engine, ci)
+
+    def _account(self, clause: Iterable[int], length: int, sign: int) -> None:
+        """add (sign=1) or remove (sign=-1) an open clause with `length` unassigned literals"""
+        cval = self.cval
+        if self.kind == "mom":
+            while len(self.by_len) <= length:
+                self.by_len.append({})
+            scores = self.by_len[length]
+            w = sign
+        else:
+            scores = self.jw
+            w = sign * JW_WEIGHTS[length if length < 100 else 99]
+        for lit in clause:
+            if cval[lit] == 0:
                 v = abs(lit)
-                if v not in assignment:
-                    counts[v] = counts.get(v, 0) + 1
-    
-    #pick variable with highest count
-    if not counts:
-        return _choose_standard(clauses, assignment)
-    
-    #return max value
-    best_var = -1
-    max_count = -1
-    for v, count in counts.items():
-        if count > max_count:
-            max_count = count
-            best_var = v
-    return best_var
-
-def _choose_jw(clauses: List[List[int]], assignment: Dict[int, bool]) -> Optional[int]:
-    """Jeroslow-Wang: Score = sum(2 ^ -length)"""
-    scores = {}
-    
-    for c in clauses:
-        #weight formula = 2^negative length
-        weight = 2.0 ** (-len(c))
-        for lit in c:
+                s = scores.get(v, 0) + w
+                if s:
+                    scores[v] = s
+                else:
+                    del scores[v]
+
+    def _assign(self, clauses: ClauseStore, lit: int) -> None:
+        occ = self.occ
+        n_true = self.n_true
+        n_free = self.n_free
+        for ci in occ[lit]:
+            n_true[ci] += 1
+            if n_true[ci] == 1:
+                self._account(clauses[ci], n_free[ci], -1)
+            n_free[ci] -= 1
+        shrinking = [ci for ci in occ[-lit] if n_true[ci] == 0]
+        for ci in shrinking:
+            self._account(clauses[ci], n_free[ci], -1)
+        self.cval[lit] = 1
+        self.cval[-lit] = -1
+        for ci in occ[-lit]:
+            n_free[ci] -= 1
+        for ci in shrinking:
+            self._account(clauses[ci], n_free[ci], 1)
+
+    def _unassign(self, clauses: ClauseStore, lit: int) -> None:
+        occ = self.occ
+        n_true = self.n_true
+        n_free = self.n_free
+        growing = [ci for ci in occ[-lit] if n_true[ci] == 0]
+        for ci in growing:
+            self._account(clauses[ci], n_free[ci], -1)
+        self.cval[lit] = 0
+        self.cval[-lit] = 0
+        for ci in occ[-lit]:
+            n_free[ci] += 1
+        for ci in growing:
+            self._account(clauses[ci], n_free[ci], 1)
+        for ci in occ[lit]:
+            n_true[ci] -= 1
+            n_free[ci] += 1
+            if n_true[ci] == 0:
+                self._account(clauses[ci], n_free[ci], 1)
+
+    def _sync(self, engine: _Engine) -> None:
+        trail = engine.trail
+        clauses = engine.db
+        for i in range(self.done, len(trail)):
+            self._assign(clauses, trail[i])
+        self.done = len(trail)
+
+    def on_backtrack(self, engine: _Engine, start: int) -> None:
+        trail = engine.trail
+        clauses = engine.db
+        while self.done > start:
+            self.done -= 1
+            self._unassign(clauses, trail[self.done])
+
+    def on_learn(self, engine: _Engine, ci: int) -> None:
+        clause = engine.db[ci]
+        cval = self.cval
+        true_count = free_count = 0
+        for lit in clause:
+            self.occ[lit].append(ci)
+            if cval[lit] == 1:
+                true_count += 1
+            elif cval[lit] == 0:
+                free_count += 1
+        self.n_true.append(true_count)
+        self.n_free.append(free_count)
+        if true_count == 0:
+            self._account(clause, free_count, 1)
+
+    def on_delete(self, engine: _Engine, ci: int) -> None:
+        if self.n_true[ci] == 0:
+            self._account(engine.db[ci], self.n_free[ci], -1)
+
+    def on_renumber(self, engine: _Engine, first: int, mapping: Dict[int, int]) -> None:
+        occ = self.occ
+        for i, cl in enumerate(occ):
+            if cl and max(cl) >= first:
+                occ[i] = array('i', [c if c < first else mapping[c] for c in cl if c < first or c in mapping])
+        kept = sorted(mapping)
+        self.n_true[first:] = [self.n_true[ci] for ci in kept]
+        self.n_free[first:] = [self.n_free[ci] for ci in kept]
+
+    def pick(self, engine: _Engine) -> Optional[int]:
+        self._sync(engine)
+        if self.kind == "mom":
+            #maximum occurances in mimimum length clauses
+            scores = None
+            for counts in self.by_len:
+                if counts:
+                    scores = counts
+                    break
+        else:
+            #Jeroslow-Wang: Score = sum(2 ^ -length)
+            scores = self.jw
+        if not scores:
+            return None
+
+        if engine.rng is not None:
+            #highest score, ties broken at random
+            best = max(scores.values())
+            return engine.rng.choice([v for v, s in scores.items() if s == best])
+
+        #highest score, ties go to the lowest variable
+        best_var = -1
+        best = -1
+        for v, s in scores.items():
+            if s > best or (s == best and v < best_var):
+                best = s
+                best_var = v
+        return best_var
+
+
+class _VarHeap:
+    """binary max-heap of variables ordered by activity, with positions for O(log n) updates"""
+
+    def __init__(self, activity: List[float]):
+        self.activity = activity
+        self.heap: List[int] = []
+        self.pos = [-1] * len(activity)
+
+    def __contains__(self, v: int) -> bool:
+        return self.pos[v] >= 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def _up(self, i: int) -> None:
+        heap = self.heap
+        pos = self.pos
+        act = self.activity
+        v = heap[i]
+        a = act[v]
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if act[p] >= a:
+                break
+            heap[i] = p
+            pos[p] = i
+            i = parent
+        heap[i] = v
+        pos[v] = i
+
+    def _down(self, i: int) -> None:
+        heap = self.heap
+        pos = self.pos
+        act = self.activity
+        n = len(heap)
+        v = heap[i]
+        a = act[v]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and act[heap[child + 1]] > act[heap[child]]:
+                child += 1
+            c = heap[child]
+            if act[c] <= a:
+                break
+            heap[i] = c
+            pos[c] = i
+            i = child
+        heap[i] = v
+        pos[v] = i
+
+    def push(self, v: int) -> None:
+        self.pos[v] = len(self.heap)
+        self.heap.append(v)
+        self._up(len(self.heap) - 1)
+
+    def pop(self) -> int:
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.pos[top] = -1
+        if heap:
+            heap[0] = last
+            self.pos[last] = 0
+            self._down(0)
+        return top
+
+    def increased(self, v: int) -> None:
+        self._up(self.pos[v])
+
+
+class _VSIDS(_Heuristic):
+    """
+    EVSIDS: variables in conflicts get their activity bumped by a growing
+    increment (equivalent to decaying everyone else), picks come off a heap.
+    """
+
+    name = "vsids"
+
+    def __init__(self, engine: _Engine, decay: float = VSIDS_DECAY):
+        n = engine.num_vars
+        self.activity = [0.0] * (n + 1)
+        if engine.rng is not None:
+            #tiny random start activities, only to break the ties among untouched variables
+            self.activity = [engine.rng.random() * 1e-6 for _ in range(n + 1)]
+        self.inc = 1.0
+        self.factor = 1.0 / decay
+        self.heap = _VarHeap(self.activity)
+        for v in range(1, n + 1):
+            self.heap.push(v)
+
+    def pick(self, engine: _Engine) -> Optional[int]:
+        value = engine.value
+        heap = self.heap
+        while heap:
+            v = heap.pop()
+            if value[v] == 0:
+                return v
+        return None
+
+    def on_backtrack(self, engine: _Engine, start: int) -> None:
+        heap = self.heap
+        for lit in engine.trail[start:]:
             v = abs(lit)
-            if v not in assignment:
-                scores[v] = scores.get(v, 0) + weight
-                
-    if not scores:
-        return _choose_standard(clauses, assignment)
-        
-    #return highest score
-    best_var = -1
-    max_score = -1.0
-    for v, score in scores.items():
-        if score > max_score:
-            max_score = score
-            best_var = v
-    return best_var
-
-#choose variable (mom, jw or standard)  
-def _choose_var(num_vars: int, assignment: Dict[int, bool], clauses: List[List[int]]) -> Optional[int]:
-    if HEURISTIC == "mom":
-        return _choose_mom(clauses, assignment)
-    elif HEURISTIC == "jw":
-        return _choose_jw(clauses, assignment)
+            if v not in heap:
+                heap.push(v)
+
+    def bump(self, v: int) -> None:
+        act = self.activity
+        act[v] += self.inc
+        if act[v] > 1e100:
+            #rescale everything to stay within float range (order is preserved)
+            for i in range(len(act)):
+                act[i] *= 1e-100
+            self.inc *= 1e-100
+        if v in self.heap:
+            self.heap.increased(v)
+
+    def decay(self) -> None:
+        self.inc *= self.factor
+
+
+def _make_heuristic(engine: _Engine, name: str) -> _Heuristic:
+    if name in ("mom", "jw"):
+        return _ClauseCounters(engine, name)
+    elif name == "vsids":
+        return _VSIDS(engine)
     else:
-        return _choose_standard(clauses, assignment)
+        return _StandardHeuristic()
 
-#DPLL algorithm
-def _dpll(clauses: List[List[int]], assignment: Dict[int, bool], num_vars: int) -> bool:
-    global BACKTRACK_COUNT
-    
-    clauses, ok = _unit_propagate(clauses, assignment)
-    if not ok:
-        return False
+#choose variable (mom, jw, vsids or standard)  
+def _choose_var(engine: _Engine) -> Optional[int]:
+    t = time.perf_counter()
+    var = engine.heuristic.pick(engine)
+    engine.stats.choose_time += time.perf_counter() - t
+    return var
 
-    if not clauses:   # no clauses left → SAT
-        return True
-    
-    var = _choose_var(num_vars, assignment, clauses)
-    if var is None:
+def _phase(engine: _Engine, var: int) -> int:
+    phase = engine.phase
+    if phase is not None and phase[var]:
+        return var if phase[var] == 1 else -var
+    if engine.rng is not None and engine.rng.random() < 0.5:
+        return -var
+    return var
+
+
+def _luby(i: int) -> int:
+    """i-th (from 1) term of the Luby sequence 1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class _Restarts:
+    """
+    Restart schedule, told about every conflict (with its LBD) and answering whether to restart now.
+
+      luby:      RESTART_BASE * luby(i) conflicts between restarts
+      geometric: RESTART_BASE * RESTART_GROWTH^i conflicts between restarts
+      lbd:       glucose: restart once the recent conflicts are clearly worse (higher LBD) than
+                 the overall average, i.e. the search has wandered somewhere unpromising
+    The luby/geometric intervals keep growing, so even DPLL without learning stays complete.
+    """
+
+    def __init__(self, policy: str):
+        if policy not in ("luby", "geometric", "lbd"):
+            raise ValueError(f"unknown restart policy: {policy}")
+        self.policy = policy
+        self.count = 0           # restarts so far
+        self.conflicts = 0       # conflicts since the last restart
+        self.limit = self._next_limit()
+        self.recent: deque = deque()
+        self.recent_sum = 0
+        self.lbd_sum = 0
+        self.lbd_n = 0
+
+    def _next_limit(self) -> int:
+        if self.policy == "luby":
+            return RESTART_BASE * _luby(self.count + 1)
+        if self.policy == "geometric":
+            return int(RESTART_BASE * RESTART_GROWTH ** self.count)
+        return 0
+
+    def conflict(self, lbd: int) -> bool:
+        self.conflicts += 1
+        if self.policy == "lbd":
+            self.lbd_sum += lbd
+            self.lbd_n += 1
+            self.recent.append(lbd)
+            self.recent_sum += lbd
+            if len(self.recent) > LBD_WINDOW:
+                self.recent_sum -= self.recent.popleft()
+            if len(self.recent) < LBD_WINDOW:
+                return False
+            if self.recent_sum / LBD_WINDOW * LBD_K <= self.lbd_sum / self.lbd_n:
+                return False
+        elif self.conflicts < self.limit:
+            return False
+
+        self.count += 1
+        self.conflicts = 0
+        self.recent.clear()
+        self.recent_sum = 0
+        self.limit = self._next_limit()
         return True
-    
-    if len(assignment) == 0: #for debugging
-        print(f"[{HEURISTIC}] first branching var = {var}")
 
+class _NogoodStore:
+    """
+    Bookkeeping for the learnt clauses (cdcl 1UIP clauses, dpll nogoods), which sit in
+    engine.db from index `first` on. Each has an LBD (fixed when recorded) and an activity
+    bumped whenever it takes part in a conflict. Once there are more than NOGOOD_MAX_CLAUSES
+    of them or more than NOGOOD_MAX_LITERALS literals, clauses are deleted until both are down
+    to half the cap: first the ones with the highest LBD and then the lowest activity, glue
+    clauses (LBD <= 2) only if that is not enough, lowest activity first. Clauses that are
+    currently a reason always stay; the next reduction runs at the cap or at NOGOOD_GROWTH
+    times what was kept, whichever is more.
+    """
+
+    def __init__(self, engine: _Engine):
+        self.first = len(engine.db)
+        self.lbd: Dict[int, int] = {}
+        self.activity: Dict[int, float] = {}
+        self.inc = 1.0
+        self.literals = 0
+        #reduce once the store is above these
+        self.max_clauses = NOGOOD_MAX_CLAUSES
+        self.max_literals = NOGOOD_MAX_LITERALS
+        self.recorded = 0
+        self.pruned = 0
+        self.hits = 0
+
+    def add(self, engine: _Engine, ci: int, lbd: int) -> None:
+        self.lbd[ci] = lbd
+        self.activity[ci] = 0.0
+        self.literals += engine.db.size[ci]
+        self.recorded += 1
+        if len(self.lbd) > self.max_clauses or self.literals > self.max_literals:
+            self.reduce(engine)
 
-    #try True
-    new_assignment = assignment.copy()
-    new_assignment[var] = True
-    new_clauses = _simplify(clauses, var)
-    if new_clauses is not None:
-        if _dpll(new_clauses, new_assignment, num_vars):
+    def add_unit(self) -> None:
+        """a learnt unit: engine.learn fixed it at level 0 instead of storing it, still counted"""
+        self.recorded += 1
+
+    def touch(self, ci: int) -> None:
+        """ci took part in a conflict"""
+        self.hits += 1
+        act = self.activity.get(ci)
+        if act is None:
+            return
+        act += self.inc
+        self.activity[ci] = act
+        if act > 1e100:
+            for k in self.activity:
+                self.activity[k] *= 1e-100
+            self.inc *= 1e-100
+
+    def decay(self) -> None:
+        self.inc /= NOGOOD_DECAY
+
+    def reduce(self, engine: _Engine) -> None:
+        t = time.perf_counter()
+        try:
+            self._reduce(engine)
+        finally:
+            engine.stats.simplify_time += time.perf_counter() - t
+
+    def _reduce(self, engine: _Engine) -> None:
+        reason = engine.reason
+        first = self.first
+        locked = set()
+        for lit in engine.trail:
+            r = reason[abs(lit)]
+            if r >= first:
+                locked.add(r)
+        lbd = self.lbd
+        activity = self.activity
+        size = engine.db.size
+        candidates = [ci for ci in lbd if ci not in locked]
+        #non-glue clauses by LBD then activity, after them the glue clauses by activity
+        candidates.sort(key=lambda ci: (0, -lbd[ci], activity[ci]) if lbd[ci] > 2 else (1, 0, activity[ci]))
+        clauses, literals = len(lbd), self.literals
+        drop = set()
+        for ci in candidates:
+            if clauses <= NOGOOD_MAX_CLAUSES // 2 and literals <= NOGOOD_MAX_LITERALS // 2:
+                break
+            drop.add(ci)
+            clauses -= 1
+            literals -= size[ci]
+        if drop:
+            keep = [ci for ci in lbd if ci not in drop]
+            mapping = engine.reduce_db(first, keep)
+            self.lbd = {mapping[ci]: lbd[ci] for ci in keep}
+            self.activity = {mapping[ci]: activity[ci] for ci in keep}
+            self.literals = sum(engine.db.size[ci] for ci in self.lbd)
+            self.pruned += len(drop)
+        self.max_clauses = max(NOGOOD_MAX_CLAUSES, int(len(self.lbd) * NOGOOD_GROWTH))
+        self.max_literals = max(NOGOOD_MAX_LITERALS, int(self.literals * NOGOOD_GROWTH))
+
+
+#DPLL algorithm (iterative: explicit decision stack + trail undo instead of recursion)
+#returns None if a budget (see _Engine.set_limits) ran out first
+def _dpll(engine: _Engine) -> Optional[bool]:
+    stats = engine.stats
+
+    #one entry per decision level: (literal tried, whether it is already the second branch)
+    decisions: List[Tuple[int, bool]] = []
+    value = engine.value
+    nogoods = engine.nogoods
+
+    while True:
+        confl = engine.propagate()
+        if confl is None:
+            # no open clauses left → SAT
+            var = _choose_var(engine)
+            if var is None:
+                return True
+
+            if not engine.trail: #for debugging
+                print(f"[{engine.heuristic.name}] first branching var = {var}")
+            if engine.limited and engine.out_of_budget():
+                return None
+
+            #try True first (randomized runs: a coin flip)
+            lit = _phase(engine, var)
+            decisions.append((lit, False))
+            engine.decide(lit)
+            continue
+
+        #conflict: undo failed branches until one still has its False side open
+        stats.conflicts += 1
+        if not decisions:
+            return False  # at level 0 (a unit nogood made the formula fail there)
+        if engine.limited and engine.out_of_budget():
+            return None
+        heuristic = engine.heuristic
+        for lit in engine.db[confl]:
+            heuristic.bump(abs(lit))
+        heuristic.decay()
+
+        nogood = None
+        if nogoods is not None:
+            nogood = engine.decision_nogood(confl)
+            nogoods.decay()
+            nogood_lbd = len(nogood)  # one decision per level
+
+        restart = engine.restarts is not None and engine.restarts.conflict(engine.lbd(engine.db[confl]))
+        if restart or (nogood is not None and len(nogood) == 1):
+            #start over from the top, the saved phases lead straight back near where we were;
+            #a one-literal nogood holds everywhere, so it goes in as a fact at level 0 there
+            stats.backtracks += 1
+            decisions.clear()
+            engine.backtrack(0)
+        else:
+            while True:
+                if not decisions:
+                    return False
+                lit, second = decisions.pop()
+                stats.backtracks += 1
+                engine.backtrack(len(decisions))
+                if not second:
+                    decisions.append((-lit, True))
+                    engine.decide(-lit)
+                    #the nogood did not involve lit: this branch is refuted already, keep going up
+                    if nogood and all(value[q] == -1 for q in nogood):
+                        nogoods.hits += 1
+                        continue
+                    break
+
+        if nogood and len(nogood) > 1:
+            nogoods.add(engine, engine.add_learnt(nogood), nogood_lbd)
+        elif nogood:
+            engine.learn(nogood)
+            nogoods.add_unit()
+
+#CDCL algorithm: learn a 1UIP clause from every conflict and jump back non-chronologically
+def _cdcl(engine: _Engine) -> Optional[bool]:
+    stats = engine.stats
+
+    while True:
+        confl = engine.propagate()
+        if confl is not None:
+            stats.conflicts += 1
+            if engine.decision_level() == 0:
+                return False
+            if engine.limited and engine.out_of_budget():
+                return None
+            learnt, back_level = engine.analyze(confl)
+            engine.heuristic.decay()
+            engine.nogoods.decay()
+            stats.backtracks += 1
+            lbd = engine.lbd(learnt)
+            restart = engine.restarts is not None and engine.restarts.conflict(lbd)
+            engine.backtrack(back_level)
+            ci = engine.learn(learnt)
+            if ci >= 0:
+                engine.nogoods.add(engine, ci, lbd)
+            else:
+                engine.nogoods.add_unit()
+            if restart:
+                #the learnt clause is asserting only at back_level, so learn it there first
+                engine.backtrack(0)
+            continue
+
+        # no open clauses left → SAT
+        var = _choose_var(engine)
+        if var is None:
             return True
+        if engine.limited and engine.out_of_budget():
+            return None
+        engine.decide(_phase(engine, var))
+
+#CDCL under assumptions: decision level i+1 belongs to assumptions[i], the search proper starts above them.
+#returns (result, core); core = the failed assumptions when the clauses + assumptions are UNSAT ([] if the
+#clauses alone are), result None once a budget (see _Engine.set_limits) runs out
+def _cdcl_assuming(engine: _Engine, assumptions: List[int]) -> Tuple[Optional[bool], Optional[List[int]]]:
+    stats = engine.stats
+    value = engine.value
+
+    while True:
+        confl = engine.propagate()
+        if confl is not None:
+            stats.conflicts += 1
+            if engine.decision_level() == 0:
+                engine.ok = False
+                return False, []
+            if engine.limited and engine.out_of_budget():
+                return None, None
+            learnt, back_level = engine.analyze(confl)
+            engine.heuristic.decay()
+            engine.nogoods.decay()
+            stats.backtracks += 1
+            lbd = engine.lbd(learnt)
+            restart = engine.restarts is not None and engine.restarts.conflict(lbd)
+            engine.backtrack(back_level)
+            ci = engine.learn(learnt)
+            if ci >= 0:
+                engine.nogoods.add(engine, ci, lbd)
+            else:
+                engine.nogoods.add_unit()
+            if restart:
+                engine.backtrack(0)
+            continue
+
+        level = engine.decision_level()
+        if level < len(assumptions):
+            lit = assumptions[level]
+            if value[lit] == 1:
+                engine.new_level()
+            elif value[lit] == -1:
+                return False, engine.assumption_core(lit)
+            else:
+                engine.decide(lit)
+            continue
+
+        var = _choose_var(engine)
+        if var is None:
+            return True, None
+        if engine.limited and engine.out_of_budget():
+            return None, None
+        engine.decide(_phase(engine, var))
+
+def _prepare(clauses: Iterable[Iterable[int]], num_vars: int, heuristic: str, seed: Optional[int] = None,
+             units: Iterable[int] = ()) -> Tuple[_Engine, bool]:
+    """engine with the clauses (+ extra unit literals) loaded and propagated; False = conflict at level 0"""
+    t = time.perf_counter()
+    engine = _Engine(num_vars)
+    if seed is not None:
+        engine.rng = random.Random(seed)
+    engine.load(clauses)
+    for lit in units:
+        engine.add_clause([lit])
+    ok = engine.ok and engine.propagate() is None
+    engine.heuristic = _make_heuristic(engine, heuristic)
+    stats = engine.stats
+    stats.simplify_time += time.perf_counter() - t - stats.propagate_time
+ 
+    #number of solved cells --> if true
+    stats.initial_props = len(engine.trail) if ok else 0
+    return engine, ok
+
+def _run(engine: _Engine, mode: str, restarts: Optional[str] = None, nogoods: bool = False) -> Optional[bool]:
+    if mode == "cdcl" or nogoods:
+        engine.nogoods = _NogoodStore(engine)
+    if restarts is not None:
+        if restarts == "lbd" and mode != "cdcl":
+            raise ValueError("lbd restarts need learnt clauses (mode 'cdcl')")
+        engine.restarts = _Restarts(restarts)
+        if PHASE_SAVING:
+            engine.phase = bytearray(engine.num_vars + 1)
+    try:
+        if mode == "cdcl":
+            return _cdcl(engine)
         else:
-            BACKTRACK_COUNT += 1
-
-    #try False
-    new_assignment = assignment.copy()
-    new_assignment[var] = False
-    new_clauses = _simplify(clauses, -var)
-    if new_clauses is not None:
-        if _dpll(new_clauses, new_assignment, num_vars):
+            return _dpll(engine)
+    finally:
+        stats = engine.stats
+        if engine.restarts is not None:
+            stats.restarts = engine.restarts.count
+        if engine.nogoods is not None:
+            stats.nogoods_recorded = engine.nogoods.recorded
+            stats.nogoods_pruned = engine.nogoods.pruned
+            stats.nogoods_hit = engine.nogoods.hits
+
+#solve budgets handed around between processes: (deadline as a time.time() value, conflicts, decisions)
+_Limits = Tuple[Optional[float], Optional[int], Optional[int]]
+_NO_LIMITS: _Limits = (None, None, None)
+
+def _apply_limits(engine: _Engine, limits: _Limits) -> None:
+    wall_deadline, conflicts, decisions = limits
+    #the engine checks time.monotonic(), which is not comparable between processes
+    deadline = time.monotonic() + (wall_deadline - time.time()) if wall_deadline is not None else None
+    engine.set_limits(conflicts, decisions, deadline)
+
+def _search(clauses: Iterable[Iterable[int]], num_vars: int, mode: str, heuristic: str,
+            seed: Optional[int] = None, restarts: Optional[str] = None, limits: _Limits = _NO_LIMITS,
+            nogoods: bool = False) -> Tuple[Optional[bool], Optional[bytearray], SolverStats]:
+    """one sequential solve: (True/False, or None if a limit ran out first; model if SAT; stats)"""
+    engine, ok = _prepare(clauses, num_vars, heuristic, seed)
+    if not ok:
+        return False, None, engine.stats
+    _apply_limits(engine, limits)
+    result = _run(engine, mode, restarts, nogoods)
+    return result, engine.model() if result else None, engine.stats
+
+def _portfolio_member(conn, clauses: ClauseStore, num_vars: int, mode: str, heuristic: str,
+                      seed: Optional[int], restarts: Optional[str], limits: _Limits, nogoods: bool) -> None:
+    sys.stdout = open(os.devnull, "w")
+    if restarts == "lbd" and mode != "cdcl":
+        restarts = None
+    conn.send(_search(clauses, num_vars, mode, heuristic, seed, restarts, limits, nogoods))
+    conn.close()
+
+def _portfolio(clauses: Iterable[Iterable[int]], num_vars: int, restarts: Optional[str] = None,
+               limits: _Limits = _NO_LIMITS, nogoods: bool = False
+               ) -> Tuple[Optional[bool], Optional[bytearray], SolverStats]:
+    """
+    Runs every PORTFOLIO configuration in its own process, takes the first answer (SAT with
+    its model, or UNSAT) and kills the rest. The stats are the winner's, with its name in stats.winner.
+    Every member gets the full limits; result None if all of them ran out (stats: the last one's).
+    """
+    if not isinstance(clauses, ClauseStore):
+        clauses = ClauseStore(clauses)
+
+    runners = []
+    for name, mode, heuristic, seed in PORTFOLIO:
+        recv_conn, send_conn = mp.Pipe(duplex=False)
+        proc = mp.Process(target=_portfolio_member,
+                          args=(send_conn, clauses, num_vars, mode, heuristic, seed, restarts, limits, nogoods))
+        proc.start()
+        send_conn.close()
+        runners.append((name, proc, recv_conn))
+
+    answer = winner = None
+    try:
+        pending = {conn: name for name, _, conn in runners}
+        while pending and winner is None:
+            for conn in wait(list(pending)):
+                name = pending.pop(conn)
+                try:
+                    answer = conn.recv()
+                except EOFError:
+                    continue  # this member died, the others may still answer
+                if answer[0] is not None:
+                    winner = name
+                    break
+    finally:
+        for _, proc, conn in runners:
+            if proc.is_alive():
+                proc.kill()
+            proc.join()
+            conn.close()
+
+    if answer is None:
+        raise RuntimeError("every portfolio member exited without an answer")
+    result, model, stats = answer
+    stats.winner = winner
+    return result, model, stats
+
+def _make_cubes(engine: _Engine, depth: int) -> Tuple[List[List[int]], bool]:
+    """
+    Cubes = the decision literals of every branch of the heuristic's search tree cut at `depth`.
+    Branches that unit propagation already refutes are left out.
+    Returns (cubes, True) instead if some branch assigns every variable on the way down.
+    """
+    cubes: List[List[int]] = []
+
+    def walk(prefix: List[int]) -> bool:
+        if len(prefix) == depth:
+            cubes.append(prefix)
+            return False
+        var = _choose_var(engine)
+        if var is None:
             return True
+        for lit in (var, -var):
+            engine.decide(lit)
+            if engine.propagate() is None and walk(prefix + [lit]):
+                return True
+            engine.backtrack(len(prefix))
+        return False
+
+    return cubes, walk([])
+
+def _solve_cube(clauses: ClauseStore, num_vars: int, mode: str, heuristic: str, restarts: Optional[str],
+                nogoods: bool, cube: List[int], limits: _Limits
+                ) -> Tuple[Optional[bool], Optional[int], SolverStats, Optional[bytearray]]:
+    """
+    Runs in a split worker: solve clauses + cube as units within limits (its conflict budget
+    and what is left of the solve's).
+    Returns (result, var, stats, model); result None means a limit ran out and var is the
+    variable to split this cube on next.
+    """
+    engine, ok = _prepare(clauses, num_vars, heuristic, units=cube)
+    if not ok:
+        return False, None, engine.stats, None
+    _apply_limits(engine, limits)
+    result = _run(engine, mode, restarts, nogoods)
+
+    var = None
+    if result is None:
+        #too hard for one job: hand it back split on the heuristic's choice at the cube's root
+        engine.backtrack(0)
+        if engine.propagate() is not None:
+            result = False
         else:
-            BACKTRACK_COUNT += 1
+            var = _choose_var(engine)
+            if var is None:
+                result = True
+    return result, var, engine.stats, engine.model() if result else None
+
+def _split(clauses: Iterable[Iterable[int]], num_vars: int, mode: str, heuristic: str,
+           restarts: Optional[str] = None, limits: _Limits = _NO_LIMITS, nogoods: bool = False
+           ) -> Tuple[Optional[bool], Optional[bytearray], SolverStats, int, int]:
+    """
+    Cube and conquer: cut the SPLIT_HEURISTIC search tree at SPLIT_DEPTH decisions and solve the
+    cubes in SPLIT_WORKERS processes. SAT as soon as one cube is SAT, UNSAT once every cube is refuted.
+    A cube that needs more than SPLIT_CONFLICT_LIMIT conflicts comes back split in two (and the
+    halves get twice the limit), so a few hard cubes do not leave the other workers idle.
+    Returns (result, model, stats, leaf cubes decided, re-splits); a re-split cube does not count, its
+    halves do. result None if the limits (conflicts and decisions summed over the cubes) ran out first.
+    The stats are the root's (making the cubes) plus those of every cube, initial_props is the root's.
+    """
+    if not isinstance(clauses, ClauseStore):
+        clauses = ClauseStore(clauses)
+
+    engine, ok = _prepare(clauses, num_vars, SPLIT_HEURISTIC)
+    totals = engine.stats
+    if not ok:
+        return False, None, totals, 0, 0
+    root_props = totals.initial_props
+    cubes, sat = _make_cubes(engine, SPLIT_DEPTH)
+    if sat:
+        return True, engine.model(), totals, 0, 0
+    del engine
+
+    wall_deadline, max_conflicts, max_decisions = limits
 
-    return False
+    def cube_limits(cube_conflicts: int) -> _Limits:
+        #the cube's own budget, or what is left of the solve's if that is less
+        if max_conflicts is not None:
+            cube_conflicts = max(0, min(cube_conflicts, max_conflicts - totals.conflicts))
+        left = max(0, max_decisions - totals.decisions) if max_decisions is not None else None
+        return wall_deadline, cube_conflicts, left
 
-def solve_cnf(clauses: Iterable[Iterable[int]], num_vars: int) -> Tuple[str, None]:
+    def spent() -> bool:
+        return ((max_conflicts is not None and totals.conflicts >= max_conflicts)
+                or (max_decisions is not None and totals.decisions >= max_decisions)
+                or (wall_deadline is not None and time.time() >= wall_deadline))
+
+    solved = resplits = 0
+    model = None
+    answer: Optional[bool] = False
+    shared = (clauses, num_vars, mode, heuristic, restarts, nogoods)
+    with WorkerPool(_solve_cube, workers=SPLIT_WORKERS, shared=shared) as pool:
+        cube_of = {}
+        for cube in cubes:
+            cube_of[pool.submit((cube, cube_limits(SPLIT_CONFLICT_LIMIT)))] = (cube, SPLIT_CONFLICT_LIMIT)
+        while pool.pending() and answer is False:
+            for job_id, status, value, _ in pool.completed():
+                cube, limit = cube_of.pop(job_id)
+                if status != "ok":
+                    pool.terminate()
+                    raise RuntimeError(f"cube {cube} failed: {value}")
+                result, var, cube_stats, cube_model = value
+                totals.add(cube_stats)
+                if result is None:
+                    if spent():
+                        answer = None
+                        break
+                    resplits += 1
+                    for lit in (var, -var):
+                        cube_of[pool.submit((cube + [lit], cube_limits(limit * 2)))] = (cube + [lit], limit * 2)
+                    continue
+                solved += 1
+                if result:
+                    answer, model = True, cube_model
+                    break
+        if answer is not False:
+            pool.terminate()
+
+    totals.initial_props = root_props
+    return answer, model, totals, solved, resplits
+
+def solve_cnf(clauses: Iterable[Iterable[int]], num_vars: int, mode: Optional[str] = None,
+              heuristic: Optional[str] = None, restarts: Optional[str] = None,
+              time_limit: Optional[float] = None, conflict_limit: Optional[int] = None,
+              decision_limit: Optional[int] = None, nogoods: Optional[bool] = None
+              ) -> Tuple[str, Optional[bytearray], SolverStats]:
     """
-        ("SAT", None)
-        ("UNSAT", None)
+        ("SAT", model, stats)   model[v] = 1 if variable v is true, 0 otherwise (model[0] unused)
+        ("UNSAT", None, stats)
+        ("UNKNOWN", None, stats)  a limit ran out first, stats cover the search so far
+
+    mode: "dpll", "cdcl", "portfolio" or "split" (cube and conquer, see _split), defaults to the module-level MODE
+    heuristic: "standard", "mom", "jw" or "vsids", defaults to the module-level HEURISTIC
+        (ignored in portfolio mode, every member brings its own)
+    restarts: None, "luby", "geometric" or "lbd", defaults to the module-level RESTARTS
+        (in portfolio mode the dpll members skip "lbd")
+    time_limit: seconds from the call, conflict_limit / decision_limit: search steps; None = no limit.
+        They are checked at every conflict and decision, so the search stops a propagation after
+        running out (loading the clauses is not interrupted). In portfolio mode every member gets
+        the conflict/decision limits, in split mode they count over all cubes.
+    nogoods: dpll records the decisions behind every conflict as a clause, defaults to the
+        module-level NOGOODS (cdcl always learns)
+    The stats are also copied into the module counters (BACKTRACK_COUNT, ...).
     """
-    global BACKTRACK_COUNT
-    BACKTRACK_COUNT = 0
-    
-    clause_list = [list(c) for c in clauses]
-    _, ok = _unit_propagate(clause_list, {})
-    
- 
-    initial_props = 0 #number of solved cells --> if true
-    if ok:
-        temp_assign = {}
-        _unit_propagate(clause_list, temp_assign)
-        initial_props = len(temp_assign)
-
-    is_sat = _dpll(clause_list, {}, num_vars)
-    
-    print(f"[{HEURISTIC.upper()}] Result: {'SAT' if is_sat else 'UNSAT'} | Backtracks: {BACKTRACK_COUNT} | InitProps: {initial_props}")
-    if is_sat:
-        return "SAT", None
+    limits = (time.time() + time_limit if time_limit is not None else None, conflict_limit, decision_limit)
+    if PROFILE:
+        profiler = _profiler()
+        profiler.enable()
+        try:
+            return _solve_cnf(clauses, num_vars, mode, heuristic, restarts, limits, nogoods)
+        finally:
+            profiler.disable()
+    return _solve_cnf(clauses, num_vars, mode, heuristic, restarts, limits, nogoods)
+
+_PROFILER = None
+
+def _profiler():
+    """one profiler per process, every solve_cnf call adds to it and the file is written once at exit"""
+    global _PROFILER
+    if _PROFILER is None:
+        import atexit
+        import cProfile
+        _PROFILER = cProfile.Profile()
+        atexit.register(_write_profile, _PROFILER, PROFILE)
+    return _PROFILER
+
+def _write_profile(profiler, path: str) -> None:
+    if path.endswith(".prof"):
+        profiler.dump_stats(path) #for snakeviz / pstats.Stats(path)
+        return
+    import pstats
+    with open(path, "w", encoding="utf-8") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("tottime").print_stats(40)
+
+def _solve_cnf(clauses: Iterable[Iterable[int]], num_vars: int, mode: Optional[str], heuristic: Optional[str],
+               restarts: Optional[str], limits: _Limits, nogoods: Optional[bool]
+               ) -> Tuple[str, Optional[bytearray], SolverStats]:
+    start = time.perf_counter()
+    mode = mode or MODE
+    heuristic = heuristic or HEURISTIC
+    restarts = restarts or RESTARTS
+    nogoods = NOGOODS if nogoods is None else nogoods
+    search_mode = SPLIT_MODE if mode == "split" else mode
+    if restarts == "lbd" and search_mode not in ("cdcl", "portfolio"):
+        raise ValueError("lbd restarts need learnt clauses (mode 'cdcl')")
+
+    if mode == "portfolio":
+        result, model, stats = _portfolio(clauses, num_vars, restarts, limits, nogoods)
+        label = f"PORTFOLIO {stats.winner}"
+    elif mode == "split":
+        result, model, stats, solved, resplits = _split(clauses, num_vars, search_mode, heuristic, restarts, limits, nogoods)
+        label = f"SPLIT {search_mode.upper()} {heuristic.upper()} cubes={solved} resplits={resplits}"
     else:
-        return "UNSAT", None
\ No newline at end of file
+        result, model, stats = _search(clauses, num_vars, mode, heuristic, restarts=restarts, limits=limits,
+                                         nogoods=nogoods)
+        label = heuristic.upper() if mode != "cdcl" else f"CDCL {heuristic.upper()}"
+    stats.solve_time = time.perf_counter() - start
+    _publish(stats)
+    status = "UNKNOWN" if result is None else ("SAT" if result else "UNSAT")
+
+    print(f"[{label}] Result: {status} | Backtracks: {stats.backtracks} | Conflicts: {stats.conflicts} | Restarts: {stats.restarts} | InitProps: {stats.initial_props} | Nogoods: {stats.nogoods_recorded} recorded, {stats.nogoods_pruned} pruned, {stats.nogoods_hit} hit")
+    return status, model, stats
+
+
+class IncrementalSolver:
+    """
+    One formula, many queries: the clauses are loaded once and every solve() call only adds
+    assumptions (e.g. the clues of a puzzle on top of the empty-grid encoding). Learnt
+    clauses, VSIDS scores and saved phases carry over from call to call.
+
+        inc = IncrementalSolver(base, num_vars)
+        if inc.solve([var(r, c, v) for each clue]):
+            inc.model       # as in solve_cnf
+        else:
+            inc.core        # the clues that already clash ([] = the base formula is UNSAT)
+
+    The formula itself is fixed; anything that changes between queries goes in as assumptions.
+    self.stats (and the module counters) describe the last call.
+    """
+
+    def __init__(self, clauses: Iterable[Iterable[int]], num_vars: int, heuristic: str = "vsids",
+                 restarts: Optional[str] = None):
+        engine = _Engine(num_vars)
+        engine.load(clauses)
+        engine.ok = engine.ok and engine.propagate() is None
+        engine.heuristic = _make_heuristic(engine, heuristic)
+        engine.nogoods = _NogoodStore(engine)
+        if restarts is not None:
+            engine.restarts = _Restarts(restarts)
+            if PHASE_SAVING:
+                engine.phase = bytearray(num_vars + 1)
+        self.engine = engine
+        self.model: Optional[bytearray] = None
+        self.core: Optional[List[int]] = None
+        self.stats = engine.stats
+        self.calls = 0
+
+    def solve(self, assumptions: Iterable[int] = (), conflict_limit: Optional[int] = None,
+              time_limit: Optional[float] = None, decision_limit: Optional[int] = None) -> Optional[bool]:
+        """
+        True (model in self.model), False (failed assumptions in self.core) or None when
+        conflict_limit conflicts, decision_limit decisions or time_limit seconds were used up first.
+        """
+        start = time.perf_counter()
+        engine = self.engine
+        self.calls += 1
+        self.model = self.core = None
+        engine.backtrack(0)
+        stats = self.stats = engine.stats = SolverStats()
+        stats.initial_props = len(engine.trail)
+        if not engine.ok:
+            self.core = []
+            _publish(stats)
+            return False
+
+        engine.set_limits(conflict_limit, decision_limit,
+                          time.monotonic() + time_limit if time_limit is not None else None)
+        nogoods = engine.nogoods
+        recorded, pruned, hits = nogoods.recorded, nogoods.pruned, nogoods.hits
+        restarts = engine.restarts.count if engine.restarts is not None else 0
+        try:
+            result, core = _cdcl_assuming(engine, list(assumptions))
+            if result:
+                self.model = engine.model()
+            self.core = core
+        finally:
+            stats.nogoods_recorded = nogoods.recorded - recorded
+            stats.nogoods_pruned = nogoods.pruned - pruned
+            stats.nogoods_hit = nogoods.hits - hits
+            if engine.restarts is not None:
+                stats.restarts = engine.restarts.count - restarts
+            engine.backtrack(0)
+            stats.solve_time = time.perf_counter() - start
+            _publish(stats)
+        return result
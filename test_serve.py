@@ -0,0 +1,47 @@
+"""
+Tests for serve.py: run with `python -m pytest -q` from this folder.
+
+The service runs in stdin mode on a batch of requests; malformed ones must get an ERROR
+answer right away without holding up (or taking down) the valid ones.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve(lines):
+    out = subprocess.run([sys.executable, "serve.py", "--workers", "1", "--warm", ""], cwd=HERE,
+                         input="".join(line + "\n" for line in lines), capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    return [json.loads(line) for line in out.stdout.splitlines()]
+
+
+def test_bad_requests_get_errors():
+    bad = {
+        "not json": "{id: 1",
+        "not an object": "[1, 2]",
+        "no puzzle": {"id": 3},
+        "bad puzzle": {"id": 4, "puzzle": "12x4"},
+        "not square": {"id": 5, "puzzle": "1" * 12},
+        "bad grid": {"id": 6, "grid": [[1, 2], [3, 4]]},
+        "value too big": {"id": 7, "grid": [[5, 0, 0, 0]] + [[0] * 4] * 3},
+        "bad mode": {"id": 8, "puzzle": "." * 16, "mode": "magic"},
+        "bad timeout": {"id": 9, "puzzle": "." * 16, "timeout": -1},
+    }
+    good = {"id": "ok", "puzzle": "1..." + "." * 12, "standard_only": True, "check": True}
+    lines = [req if isinstance(req, str) else json.dumps(req) for req in bad.values()] + [json.dumps(good)]
+    answers = serve(lines)
+
+    assert len(answers) == len(lines)
+    errors = [a for a in answers if a["id"] != "ok"]
+    assert all(a["status"] == "ERROR" and a["error"] for a in errors)
+    #ids are echoed where the request could be read as an object
+    assert sorted(a["id"] for a in errors if a["id"] is not None) == list(range(3, 10))
+    by_id = {a["id"]: a["error"] for a in errors}
+    assert "mode" in by_id[8] and "timeout" in by_id[9]
+    (answer,) = [a for a in answers if a["id"] == "ok"]
+    assert answer["status"] == "SAT" and answer["solution"][0][0] == 1
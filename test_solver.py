@@ -0,0 +1,257 @@
+"""
+Tests for the solver and the CNF plumbing: run with `python -m pytest -q` from this folder.
+
+Every search configuration is checked against brute force on small random CNFs, the
+at-most-one encodings on 9x9 puzzles with check_solution, presolve and the clue-aware encoding
+against the plain encoding on mutated puzzles, and the CNF files by a round trip.
+"""
+
+import itertools
+import os
+import random
+
+import pytest
+
+import solver
+from clause_store import ClauseStore
+from dimacs import write_dimacs, write_binary, read_dimacs, read_binary, load_cnf
+from encoder import parse_file, grid_to_cnf, decode_model, check_solution, AMO_ENCODINGS, MAX_PARSE_WARNINGS
+from preprocess import preprocess, extend_model
+from presolve import propagate_grid, elimination_clauses
+
+BENCH_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "NCSudoku_benchmark_set")
+
+
+def random_cnf(rng, num_vars, num_clauses, lengths=(3,)):
+    """clause lengths drawn from lengths; a variable may repeat, so tautologies and duplicates occur"""
+    return [[rng.choice((-1, 1)) * rng.randint(1, num_vars) for _ in range(rng.choice(lengths))]
+            for _ in range(num_clauses)]
+
+def brute_force(clauses, num_vars):
+    for bits in itertools.product((False, True), repeat=num_vars):
+        if all(any((lit > 0) == bits[abs(lit) - 1] for lit in c) for c in clauses):
+            return True
+    return False
+
+def satisfies(model, clauses):
+    return all(any((lit > 0) == bool(model[abs(lit)]) for lit in c) for c in clauses)
+
+#(clauses, num_vars, satisfiable): small enough for brute force, random 3-SAT near the threshold so
+#that many are UNSAT and most need some search; the last ones mix in unit, binary and 4-literal clauses
+def _formulas(count, seed):
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        n = rng.randint(8, 14)
+        lengths = (3,) if i < count - 10 else (1, 2, 3, 4)
+        clauses = random_cnf(rng, n, rng.randint(4 * n, 5 * n), lengths)
+        out.append((clauses, n, brute_force(clauses, n)))
+    return out
+
+FORMULAS = _formulas(60, 1)
+#portfolio and split start processes for every solve, so they get fewer
+FEW_FORMULAS = FORMULAS[::7]
+
+def _configs():
+    for mode in ("dpll", "cdcl"):
+        for heuristic in ("standard", "mom", "jw", "vsids"):
+            for restarts in (None, "luby", "geometric", "lbd"):
+                if restarts == "lbd" and mode != "cdcl":
+                    continue
+                for nogoods in ((False, True) if mode == "dpll" else (False,)):
+                    yield mode, heuristic, restarts, nogoods
+
+
+@pytest.fixture
+def busy_solver(monkeypatch):
+    """settings that make tiny formulas restart, reduce the nogood store and re-split cubes"""
+    monkeypatch.setattr(solver, "RESTART_BASE", 2)
+    monkeypatch.setattr(solver, "NOGOOD_MAX_CLAUSES", 4)
+    monkeypatch.setattr(solver, "SPLIT_DEPTH", 2)
+    monkeypatch.setattr(solver, "SPLIT_WORKERS", 2)
+    monkeypatch.setattr(solver, "SPLIT_CONFLICT_LIMIT", 1)
+
+
+def _check(result, clauses, sat):
+    status, model, stats = result
+    assert status == ("SAT" if sat else "UNSAT")
+    if sat:
+        assert satisfies(model, clauses)
+    else:
+        assert model is None
+    assert isinstance(stats, solver.SolverStats)
+
+
+@pytest.mark.parametrize("mode,heuristic,restarts,nogoods", list(_configs()))
+def test_search_matches_brute_force(busy_solver, mode, heuristic, restarts, nogoods):
+    for clauses, n, sat in FORMULAS:
+        _check(solver.solve_cnf(clauses, n, mode=mode, heuristic=heuristic, restarts=restarts, nogoods=nogoods),
+               clauses, sat)
+
+@pytest.mark.parametrize("restarts", [None, "luby"])
+def test_portfolio_matches_brute_force(busy_solver, restarts):
+    for clauses, n, sat in FEW_FORMULAS:
+        _check(solver.solve_cnf(clauses, n, mode="portfolio", restarts=restarts), clauses, sat)
+
+@pytest.mark.parametrize("heuristic,nogoods", [("mom", False), ("vsids", True)])
+def test_split_matches_brute_force(busy_solver, monkeypatch, heuristic, nogoods):
+    for split_mode in ("dpll", "cdcl"):
+        monkeypatch.setattr(solver, "SPLIT_MODE", split_mode)
+        for clauses, n, sat in FEW_FORMULAS:
+            _check(solver.solve_cnf(clauses, n, mode="split", heuristic=heuristic, nogoods=nogoods), clauses, sat)
+
+def test_learnt_units_are_counted():
+    #every cdcl conflict above level 0 learns one clause, a unit or not
+    for clauses, n, _ in FORMULAS:
+        _, _, stats = solver.solve_cnf(clauses, n, mode="cdcl", heuristic="vsids")
+        assert stats.nogoods_recorded == stats.backtracks
+
+def test_limits_give_unknown():
+    #pigeonhole 6 -> 5: UNSAT, and needs far more than one conflict
+    holes = 5
+    var = lambda p, h: p * holes + h + 1
+    clauses = [[var(p, h) for h in range(holes)] for p in range(holes + 1)]
+    clauses += [[-var(p, h), -var(q, h)] for h in range(holes) for p in range(holes + 1) for q in range(p)]
+    num_vars = (holes + 1) * holes
+    for mode in ("dpll", "cdcl"):
+        status, model, stats = solver.solve_cnf(clauses, num_vars, mode=mode, heuristic="mom", conflict_limit=1)
+        assert status == "UNKNOWN" and model is None
+        assert stats.conflicts <= 1
+        status, _, _ = solver.solve_cnf(clauses, num_vars, mode=mode, heuristic="mom", decision_limit=2)
+        assert status == "UNKNOWN"
+
+def test_incremental_matches_brute_force():
+    rng = random.Random(2)
+    for clauses, n, _ in FORMULAS[:20]:
+        inc = solver.IncrementalSolver(clauses, n)
+        for _ in range(5):
+            assumptions = [rng.choice((-1, 1)) * v for v in rng.sample(range(1, n + 1), rng.randint(0, n))]
+            sat = brute_force(clauses + [[a] for a in assumptions], n)
+            assert inc.solve(assumptions) == sat
+            if sat:
+                assert satisfies(inc.model, clauses) and all(satisfies(inc.model, [[a]]) for a in assumptions)
+            else:
+                #the core is a subset of the assumptions that is UNSAT on its own
+                assert set(inc.core) <= set(assumptions)
+                assert not brute_force(clauses + [[a] for a in inc.core], n)
+
+def test_preprocess_keeps_satisfiability():
+    for clauses, n, sat in FORMULAS:
+        reduced, reconstruction = preprocess(clauses, n)
+        status, model, _ = solver.solve_cnf(reduced, n, mode="cdcl", heuristic="vsids")
+        assert status == ("SAT" if sat else "UNSAT")
+        if sat:
+            extend_model(model, reconstruction)
+            assert satisfies(model, clauses)
+
+
+#one puzzle that takes some search under the standard rules, one with the non-consecutive rule
+PUZZLES = [
+    (os.path.join("compact_sudokus", "all_9x9.txt"), 1, False),
+    (os.path.join("test_sat", "1.txt"), 0, True),
+]
+
+@pytest.mark.parametrize("encoding", AMO_ENCODINGS)
+@pytest.mark.parametrize("path,index,use_nc_rule", PUZZLES)
+def test_amo_encodings_solve_sudoku(encoding, path, index, use_nc_rule):
+    grid, N, B = list(parse_file(os.path.join(BENCH_SET, path)))[index]
+    clauses, num_vars = grid_to_cnf(grid, N, B, use_non_consecutive=use_nc_rule, amo_encoding=encoding)
+    status, model, _ = solver.solve_cnf(clauses, num_vars, mode="cdcl", heuristic="vsids")
+    assert status == "SAT"
+    assert check_solution(decode_model(model, N), N, B, use_non_consecutive=use_nc_rule, givens=grid) == []
+
+
+def _mutated_puzzles(seed):
+    """
+    (grid, N, B): random 4x4 clue sets, and 9x9 puzzles that keep 20 cells of a non-consecutive
+    solution and change up to two, so that SAT and UNSAT both come up under both rule sets
+    (no 4x4 grid is non-consecutive, there every puzzle is UNSAT under that rule)
+    """
+    rng = random.Random(seed)
+    out = []
+    for _ in range(30):
+        grid = [[0] * 4 for _ in range(4)]
+        for _ in range(rng.randint(2, 6)):
+            grid[rng.randrange(4)][rng.randrange(4)] = rng.randint(1, 4)
+        out.append((grid, 4, 2))
+    grid, N, B = next(parse_file(os.path.join(BENCH_SET, "test_sat", "1.txt")))
+    _, model, _ = solver.solve_cnf(*grid_to_cnf(grid, N, B), mode="cdcl", heuristic="vsids")
+    solution = decode_model(model, N)
+    for _ in range(12):
+        mutated = [[0] * N for _ in range(N)]
+        for i in rng.sample(range(N * N), 20):
+            r, c = divmod(i, N)
+            mutated[r][c] = solution[r][c]
+        for _ in range(rng.randint(0, 2)):
+            mutated[rng.randrange(N)][rng.randrange(N)] = rng.randint(1, N)
+        out.append((mutated, N, B))
+    return out
+
+MUTATED_PUZZLES = _mutated_puzzles(4)
+
+def _solve_grid(clauses, num_vars, grid, N, B, use_nc_rule):
+    """status, and for SAT whether the decoded grid passes check_solution against the original givens"""
+    status, model, _ = solver.solve_cnf(clauses, num_vars, mode="cdcl", heuristic="vsids")
+    if status == "SAT":
+        assert check_solution(decode_model(model, N), N, B, use_non_consecutive=use_nc_rule, givens=grid) == []
+    return status
+
+@pytest.mark.parametrize("use_nc_rule", [False, True])
+def test_presolve_matches_plain_encoding(use_nc_rule):
+    for grid, N, B in MUTATED_PUZZLES:
+        expected = _solve_grid(*grid_to_cnf(grid, N, B, use_non_consecutive=use_nc_rule), grid, N, B, use_nc_rule)
+        reduced = propagate_grid(grid, N, B, use_non_consecutive=use_nc_rule)
+        if reduced is None:
+            assert expected == "UNSAT"
+            continue
+        reduced_grid, candidates = reduced
+        #presolve only adds to the givens
+        assert all(reduced_grid[r][c] == grid[r][c] for r in range(N) for c in range(N) if grid[r][c])
+        clauses, num_vars = grid_to_cnf(reduced_grid, N, B, use_non_consecutive=use_nc_rule)
+        clauses.extend(elimination_clauses(candidates, N))
+        assert _solve_grid(clauses, num_vars, grid, N, B, use_nc_rule) == expected
+
+
+@pytest.mark.parametrize("encoding", AMO_ENCODINGS)
+@pytest.mark.parametrize("use_nc_rule", [False, True])
+def test_simplify_clues_matches_plain_encoding(encoding, use_nc_rule):
+    for grid, N, B in MUTATED_PUZZLES:
+        opts = dict(use_non_consecutive=use_nc_rule, amo_encoding=encoding)
+        expected = _solve_grid(*grid_to_cnf(grid, N, B, **opts), grid, N, B, use_nc_rule)
+        assert _solve_grid(*grid_to_cnf(grid, N, B, simplify_clues=True, **opts), grid, N, B, use_nc_rule) == expected
+
+def test_simplify_clues_contradicting_givens():
+    #two 3s in the first row: the encoder gives up with the empty clause
+    grid = [[0] * 9 for _ in range(9)]
+    grid[0][0] = grid[0][5] = 3
+    clauses, num_vars = grid_to_cnf(grid, 9, 3, simplify_clues=True)
+    assert [list(c) for c in clauses] == [[]] and num_vars == 9 ** 3
+    assert solver.solve_cnf(clauses, num_vars)[0] == "UNSAT"
+
+
+def test_cnf_files_round_trip(tmp_path):
+    rng = random.Random(3)
+    clauses = random_cnf(rng, 40, 300) + [[7], [-1, 2, -3, 4, -5, 6, -7, 8, -9, 10]]
+    expected = [list(c) for c in clauses]
+    for name, write, read in (("f.cnf", write_dimacs, read_dimacs), ("f.cnfb", write_binary, read_binary)):
+        path = str(tmp_path / name)
+        write(clauses, 40, path)
+        for store, num_vars in (read(path), load_cnf(path)):
+            assert isinstance(store, ClauseStore)
+            assert num_vars == 40
+            assert [list(c) for c in store] == expected
+
+
+def test_parse_file_blank_lines_and_broken_grids(tmp_path, capsys):
+    rows = open(os.path.join(BENCH_SET, "9_sat", "sat_000.txt")).read().split("\n")[:9]
+    banded = tmp_path / "banded.txt"
+    banded.write_text("\n".join(rows[:3] + [""] + rows[3:6] + ["", ""] + rows[6:]) + "\n")
+    assert [g for g, _, _ in parse_file(str(banded))] == [[[int(x) for x in r.split()] for r in rows]]
+    #six grids that break off after 3 rows: one warning each up to MAX_PARSE_WARNINGS, all 18 rows counted
+    broken = tmp_path / "broken.txt"
+    broken.write_text("".join((" ".join(["0"] * (16 if i % 2 else 9)) + "\n") * 3 for i in range(6)))
+    capsys.readouterr()
+    assert list(parse_file(str(broken))) == []
+    err = capsys.readouterr().err.splitlines()
+    assert len(err) == MAX_PARSE_WARNINGS + 1
+    assert err[-1].endswith("18 malformed line(s) skipped")
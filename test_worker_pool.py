@@ -0,0 +1,50 @@
+"""
+Tests for worker_pool.py: run with `python -m pytest -q` from this folder.
+
+The guarantees the batch runners rely on: results come back in job order, a job past its
+timeout is killed and its worker replaced, and a crashed or raising job is reported
+without taking the pool down.
+"""
+
+import os
+import time
+
+from worker_pool import WorkerPool
+
+
+def nap(seconds, value):
+    time.sleep(seconds)
+    return value
+
+def crash(code):
+    os._exit(code)
+
+def fail(message):
+    raise ValueError(message)
+
+
+def test_imap_keeps_job_order():
+    #the later jobs finish first
+    with WorkerPool(nap, workers=3) as pool:
+        results = list(pool.imap((0.3 - 0.1 * i, i) for i in range(3)))
+    assert [(status, value) for status, value, _ in results] == [("ok", 0), ("ok", 1), ("ok", 2)]
+
+def test_timeout_kills_and_replaces_the_worker():
+    with WorkerPool(nap, workers=1, timeout=0.5) as pool:
+        first = pool.workers[0].proc
+        start = time.monotonic()
+        results = list(pool.imap([(30, "slow"), (0, "next")]))
+        assert time.monotonic() - start < 10
+        assert results[0] == ("timeout", None, 0.5)
+        assert results[1][:2] == ("ok", "next")
+        assert not first.is_alive() and pool.workers[0].proc is not first
+
+def test_crash_and_exception_are_reported():
+    with WorkerPool(crash, workers=1) as pool:
+        assert list(pool.imap([(3,)])) == [("error", "worker exited with code 3", 0.0)]
+        #the replacement worker runs the same function
+        assert len(pool.workers) == 1 and pool.workers[0].proc.is_alive()
+    with WorkerPool(fail, workers=2) as pool:
+        results = list(pool.imap([("bad input",), ("worse input",)]))
+    assert [(status, value) for status, value, _ in results] == [("error", "ValueError: bad input"),
+                                                                ("error", "ValueError: worse input")]
@@ -0,0 +1,240 @@
+"""
+Long-lived worker processes for batches of small solver jobs.
+
+Every worker imports the encoder/solver once and then takes jobs over a pipe,
+so thousands of easy puzzles no longer each pay for a fresh interpreter.
+A job that runs past its timeout is stopped by killing its worker and starting
+a new one in its place (a running solve cannot be interrupted any other way).
+
+    with WorkerPool(solve_line, workers=4, timeout=120) as pool:
+        for status, value, seconds in pool.imap((line,) for line in lines):
+            ...
+
+status is "ok" (value = what the function returned), "timeout" (value = None)
+or "error" (value = the exception text).
+"""
+
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+#seconds a job may run past its own time limit (e.g. the solver's time_limit) before the
+#runners' pool timeout kills its worker instead of waiting for the result
+KILL_GRACE = 10
+
+#set inside worker processes; pools started from a worker stay in its process group
+_IN_WORKER = False
+
+
+def _worker_loop(conn, func: Callable, shared: Tuple, quiet: bool, new_group: bool) -> None:
+    global _IN_WORKER
+    _IN_WORKER = True
+    if new_group and hasattr(os, "setpgrp"):
+        #own process group, so a kill also takes down whatever the job started (portfolio solvers, nested pools)
+        os.setpgrp()
+    if quiet:
+        #the solver prints a line per solve, nobody reads it in here
+        sys.stdout = open(os.devnull, "w")
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        start = time.perf_counter()
+        try:
+            value = func(*shared, *job)
+            status = "ok"
+        except Exception as e:
+            value = f"{type(e).__name__}: {e}"
+            status = "error"
+        conn.send((status, value, time.perf_counter() - start))
+    conn.close()
+
+
+class _Worker:
+    __slots__ = ("proc", "conn", "job_id", "deadline", "timeout")
+
+    def __init__(self, proc, conn):
+        self.proc = proc
+        self.conn = conn
+        self.job_id = -1 #job running on it, -1 = idle
+        self.deadline = None
+        self.timeout = None #of the running job
+
+
+class WorkerPool:
+    def __init__(self, func: Callable, workers: int = 1, timeout: Optional[float] = None, quiet: bool = True,
+                 shared: Tuple = ()):
+        """
+        func: module-level function, called as func(*shared, *job) in a worker
+        timeout: seconds per job (None = no limit)
+        quiet: send the workers' stdout to /dev/null
+        shared: leading arguments that are the same for every job (e.g. a big clause store),
+            handed to each worker once when it starts instead of with every job
+        """
+        self.func = func
+        self.timeout = timeout
+        self.quiet = quiet
+        self.shared = tuple(shared)
+        self.queue: Deque[Tuple[int, Tuple, Optional[float]]] = deque()   # submitted, not on a worker yet
+        self.next_id = 0
+        self.workers = [self._spawn() for _ in range(max(1, workers))]
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = mp.Pipe()
+        #not a daemon: daemons may not start processes, and the portfolio solver does
+        proc = mp.Process(target=_worker_loop,
+                          args=(child_conn, self.func, self.shared, self.quiet, not _IN_WORKER))
+        proc.start()
+        child_conn.close()
+        return _Worker(proc, parent_conn)
+
+    @staticmethod
+    def _kill(w: _Worker) -> None:
+        if _IN_WORKER or not hasattr(os, "killpg"):
+            #nested pool: the workers share our process group, only the one can go
+            w.proc.kill()
+        else:
+            try:
+                os.killpg(w.proc.pid, signal.SIGKILL)
+            except OSError:
+                w.proc.kill()
+        w.proc.join()
+
+    def _replace(self, w: _Worker) -> None:
+        self._kill(w)
+        w.conn.close()
+        self.workers[self.workers.index(w)] = self._spawn()
+
+    def submit(self, job: Tuple, timeout: Optional[float] = None) -> int:
+        """queue a job (a tuple of arguments for func), returns its id; timeout overrides the pool's for this job"""
+        job_id = self.next_id
+        self.next_id += 1
+        self.queue.append((job_id, tuple(job), self.timeout if timeout is None else timeout))
+        return job_id
+
+    def idle(self) -> int:
+        """workers that would have nothing to do after the queued jobs are handed out"""
+        return sum(1 for w in self.workers if w.job_id < 0) - len(self.queue)
+
+    def pending(self) -> int:
+        """jobs submitted but not finished"""
+        return len(self.queue) + sum(1 for w in self.workers if w.job_id >= 0)
+
+    def _dispatch(self) -> None:
+        for w in self.workers:
+            if not self.queue:
+                break
+            if w.job_id >= 0:
+                continue
+            job_id, job, timeout = self.queue.popleft()
+            w.conn.send(job)
+            w.job_id = job_id
+            w.timeout = timeout
+            w.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def completed(self, also: Iterable = ()) -> List[Tuple[int, str, Any, float]]:
+        """
+        Hands queued jobs to idle workers and blocks until at least one running job
+        finishes or times out. Returns [(job id, status, value, seconds)], [] if nothing is pending.
+        also: more things to wait on (sockets, connections, file descriptors); when one of
+        them is ready first this returns early, possibly with [].
+        """
+        self._dispatch()
+        busy = [w for w in self.workers if w.job_id >= 0]
+        also = list(also)
+        if not busy and not also:
+            return []
+
+        deadlines = [w.deadline for w in busy if w.deadline is not None]
+        wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        ready = wait([w.conn for w in busy] + also, timeout=wait_for)
+
+        results = []
+        now = time.monotonic()
+        for w in busy:
+            job_id = w.job_id
+            if w.conn in ready:
+                try:
+                    results.append((job_id, *w.conn.recv()))
+                    w.job_id = -1
+                except (EOFError, OSError):
+                    #worker died mid-job (killed, out of memory, ...); exitcode is only set once it is joined
+                    w.proc.join(timeout=1)
+                    results.append((job_id, "error", f"worker exited with code {w.proc.exitcode}", 0.0))
+                    self._replace(w)
+            elif w.deadline is not None and now >= w.deadline:
+                results.append((job_id, "timeout", None, w.timeout))
+                self._replace(w)
+        return results
+
+    def cancel(self) -> None:
+        """drop the queued jobs and restart the workers that are busy (their results are lost)"""
+        self.queue.clear()
+        for w in list(self.workers):
+            if w.job_id >= 0:
+                self._replace(w)
+
+    def imap(self, jobs: Iterable[Tuple]) -> Iterator[Tuple[str, Any, float]]:
+        """
+        Runs every job (a tuple of arguments for func) and yields (status, value, seconds)
+        in the order of jobs, as soon as each result and all results before it are in.
+        jobs is consumed lazily, at most one job per worker ahead.
+        """
+        jobs = iter(jobs)
+        done: Dict[int, Tuple[str, Any, float]] = {}
+        next_out = self.next_id
+        exhausted = False
+
+        while True:
+            while not exhausted and self.idle() > 0:
+                try:
+                    self.submit(next(jobs))
+                except StopIteration:
+                    exhausted = True
+
+            while next_out in done:
+                yield done.pop(next_out)
+                next_out += 1
+
+            if not self.pending():
+                if exhausted:
+                    return
+                continue
+
+            for job_id, status, value, seconds in self.completed():
+                done[job_id] = (status, value, seconds)
+
+    def close(self) -> None:
+        for w in self.workers:
+            try:
+                w.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for w in self.workers:
+            w.proc.join(timeout=1)
+            if w.proc.is_alive():
+                self._kill(w)
+            w.conn.close()
+        self.workers = []
+
+    def terminate(self) -> None:
+        """kill every worker right away"""
+        for w in self.workers:
+            self._kill(w)
+            w.conn.close()
+        self.workers = []
+        self.queue.clear()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()